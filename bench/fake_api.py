@@ -0,0 +1,135 @@
+# bench/fake_api.py
+import asyncio, itertools, json, time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "SUNERA", "username": "sunera_bench_bot"}
+
+class FakeBotAPI:
+    """Local stand-in for api.telegram.org.
+
+    Serves ``getUpdates`` from an in-memory queue and records every outgoing
+    bot call. :meth:`send` injects an update and returns a future that resolves
+    with the latency until the bot's first call addressed to that chat.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8181, api_latency: float = 0.0, send_limit: int = 0):
+        self.host, self.port = host, port
+        self.api_latency = api_latency
+        self.send_limit = send_limit  # messages per second before answering 429, like Telegram; 0 -> unlimited
+        self.rejected = 0
+        self._window = (0, 0)  # (second, messages sent in it)
+        self.base_url = f"http://{host}:{port}/bot"
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.sent: Dict[int, List[dict]] = defaultdict(list)
+        self._updates: List[dict] = []
+        self._new_update = asyncio.Event()
+        self._waiters: Dict[int, List[tuple]] = defaultdict(list)
+        self._ids = itertools.count(1)
+        self._msg_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._on_call)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    # ===== update injection =====
+
+    def send(self, update: dict, chat_id: int) -> asyncio.Future:
+        update["update_id"] = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[chat_id].append((time.perf_counter(), fut))
+        self._updates.append(update)
+        self._new_update.set()
+        return fut
+
+    def message(self, chat_id: int, text: str, lang: str) -> dict:
+        msg = {"message_id": next(self._msg_ids), "date": int(time.time()), "chat": {"id": chat_id, "type": "private"},
+               "from": _user(chat_id, lang), "text": text}
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"message": msg}
+
+    def contact(self, chat_id: int, phone: str, lang: str) -> dict:
+        return {"message": {"message_id": next(self._msg_ids), "date": int(time.time()),
+                            "chat": {"id": chat_id, "type": "private"}, "from": _user(chat_id, lang),
+                            "contact": {"phone_number": phone, "first_name": "Bench", "user_id": chat_id}}}
+
+    def callback(self, chat_id: int, data: str, lang: str) -> dict:
+        return {"callback_query": {"id": str(next(self._msg_ids)), "from": _user(chat_id, lang), "chat_instance": "1",
+                                   "data": data, "message": {"message_id": 1, "date": int(time.time()),
+                                                             "chat": {"id": chat_id, "type": "private"},
+                                                             "from": BOT_USER, "text": "menu"}}}
+
+    # ===== Bot API =====
+
+    async def _on_call(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = dict(await request.post())
+        self.calls[method] += 1
+        if method == "getUpdates":
+            return _ok(await self._get_updates(data))
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        if method == "getMe":
+            return _ok(BOT_USER)
+        if method in ("sendMessage", "editMessageText"):
+            if self._over_limit():
+                self.rejected += 1
+                return web.Response(text=json.dumps({"ok": False, "error_code": 429, "description":
+                                                     "Too Many Requests: retry after 1", "parameters": {"retry_after": 1}}),
+                                    status=429, content_type="application/json")
+            chat_id = int(data.get("chat_id") or 0)
+            self._record(chat_id, method, data)
+            return _ok({"message_id": next(self._msg_ids), "date": int(time.time()), "from": BOT_USER,
+                        "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", "")})
+        if method == "answerCallbackQuery":
+            # callback answers carry no chat id; they are matched by the following edit/send
+            return _ok(True)
+        return _ok(True)
+
+    def _over_limit(self) -> bool:
+        if not self.send_limit:
+            return False
+        second = int(time.monotonic())
+        sec, n = self._window
+        n = n + 1 if sec == second else 1
+        self._window = (second, n)
+        return n > self.send_limit
+
+    async def _get_updates(self, data: dict) -> list:
+        offset = int(data.get("offset") or 0)
+        timeout = float(data.get("timeout") or 0)
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:100]
+
+    def _record(self, chat_id: int, method: str, data: dict):
+        self.sent[chat_id].append({"method": method, "text": data.get("text", "")})
+        waiters = self._waiters.get(chat_id)
+        if waiters:
+            t0, fut = waiters.pop(0)
+            if not fut.done():
+                fut.set_result(time.perf_counter() - t0)
+
+def _user(uid: int, lang: str) -> dict:
+    return {"id": uid, "is_bot": False, "first_name": f"User{uid}", "username": f"user{uid}", "language_code": lang}
+
+def _ok(result) -> web.Response:
+    return web.Response(text=json.dumps({"ok": True, "result": result}), content_type="application/json")
@@ -0,0 +1,197 @@
+# bench/loadtest.py
+"""Replay scripted multi-language conversations through main.main() against a fake Bot API.
+
+    python -m bench.loadtest --users 200 --concurrency 50 --sheets-latency 0.3
+    python -m bench.loadtest --users 200 --blocking-sheets   # pre-journal form_note behaviour
+
+Google Sheets is replaced by a stub spreadsheet and SMTP by a local sink, both with
+configurable latency. Reports p50/p95/p99 latency (update injected -> first bot
+reply in that chat) per flow step, updates/sec and the process RSS.
+"""
+import argparse, asyncio, json, logging, os, random, signal, sys, tempfile, time
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+LANGS = ["ru", "en", "es", "pl", "de", "uk"]
+FLOWS = ["form", "credit", "solar", "lang"]
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--users", type=int, default=100, help="virtual users (one private chat each)")
+    p.add_argument("--concurrency", type=int, default=20, help="users talking at the same time")
+    p.add_argument("--rounds", type=int, default=2, help="flows each user runs")
+    p.add_argument("--flows", default=",".join(FLOWS), help="subset of " + ",".join(FLOWS))
+    p.add_argument("--think", type=float, default=0.0, help="pause between a reply and the next message, sec")
+    p.add_argument("--timeout", type=float, default=15.0, help="max wait for a reply, sec")
+    p.add_argument("--sheets-latency", type=float, default=0.3)
+    p.add_argument("--smtp-latency", type=float, default=0.05)
+    p.add_argument("--api-latency", type=float, default=0.0, help="fake Bot API latency per call")
+    p.add_argument("--blocking-sheets", action="store_true", help="append each lead inline in form_note")
+    p.add_argument("--concurrent-updates", type=int, default=None, help="MAX_CONCURRENT_UPDATES for the bot")
+    p.add_argument("--flood-guard", action="store_true", help="keep the default anti-flood limits")
+    p.add_argument("--telegram-limits", action="store_true", help="keep the default outgoing rate limits")
+    p.add_argument("--api-send-limit", type=int, default=0, help="fake Bot API answers 429 above this many sends/sec")
+    p.add_argument("--api-port", type=int, default=8181)
+    p.add_argument("--smtp-port", type=int, default=8025)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--log-level", default="WARNING", help="bot log level during the run")
+    p.add_argument("--json", help="also write the report to this file")
+    return p.parse_args(argv)
+
+def configure_env(args, workdir: str):
+    """Must run before config/main are imported: config reads the environment at import."""
+    env = {
+        "TELEGRAM_BOT_TOKEN": "123456:bench",
+        "TELEGRAM_API_BASE_URL": f"http://127.0.0.1:{args.api_port}/bot",
+        "BOT_MODE": "polling",
+        "WORKERS": "1",
+        "ADMIN_CHAT_ID": "999",
+        "LEADS_JOURNAL_PATH": os.path.join(workdir, "leads.sqlite3"),
+        "PERSISTENCE_PATH": os.path.join(workdir, "state.sqlite3"),
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(args.smtp_port),
+        "LEADS_EMAILS": "leads@bench.local",
+    }
+    if args.concurrent_updates:
+        env["MAX_CONCURRENT_UPDATES"] = str(args.concurrent_updates)
+    if not args.flood_guard:
+        env["ANTI_FLOOD_BURST"] = "1000000"
+    if not args.telegram_limits:
+        env["OUTBOX_GLOBAL_RATE"] = env["OUTBOX_CHAT_RATE"] = "0"
+    os.environ.update(env)
+
+def script(flow: str, lang: str, n: int = 0) -> List[tuple]:
+    from utils.common import t
+    if flow == "form":  # one phone per user: leads with the same phone are merged by the dedup index
+        return [("text", t("menu_form", lang)), ("text", "Bench User"), ("contact", f"+48512{n % 1000000:06d}"),
+                ("text", "Warszawa"), ("text", "6 kW, 2025")]
+    if flow == "credit":
+        return [("text", t("menu_credit", lang)), ("text", "8000 5 8")]
+    if flow == "solar":
+        return [("text", t("menu_solar", lang)), ("text", "450 0.22 4.2")]
+    return [("text", "/lang"), ("callback", f"lang:{lang}")]
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def run(args) -> dict:
+    from bench.fake_api import FakeBotAPI
+    from bench.stubs import StubSpreadsheet, SmtpSink
+
+    api = FakeBotAPI(port=args.api_port, api_latency=args.api_latency, send_limit=args.api_send_limit)
+    smtp = SmtpSink(port=args.smtp_port, latency=args.smtp_latency)
+    await api.start(); await smtp.start()
+
+    import main as bot
+    from utils.sheets import sheets
+    logging.getLogger().setLevel(args.log_level.upper())
+    sheets.load_shards(StubSpreadsheet(args.sheets_latency))
+    if args.blocking_sheets:
+        async def submit_inline(*lead):
+            return sheets.append_lead(*lead)
+        sheets.submit_lead = submit_inline
+
+    rss_start = rss_mb()
+    main_task = asyncio.create_task(bot.main())
+    while not api.calls.get("getUpdates"):
+        if main_task.done():
+            main_task.result()
+        await asyncio.sleep(0.05)
+
+    rng = random.Random(args.seed)
+    flows = [f for f in args.flows.split(",") if f in FLOWS]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    timeouts = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def user(n: int):
+        nonlocal timeouts
+        chat_id = 10_000 + n
+        lang = LANGS[n % len(LANGS)]
+        plan = [rng.choice(flows) for _ in range(args.rounds)]
+        async with sem:
+            for flow in plan:
+                for step, (kind, payload) in enumerate(script(flow, lang, n)):
+                    if kind == "text":
+                        update = api.message(chat_id, payload, lang)
+                    elif kind == "contact":
+                        update = api.contact(chat_id, payload, lang)
+                    else:
+                        update = api.callback(chat_id, payload, lang)
+                    try:
+                        latencies[f"{flow}[{step}]"].append(await asyncio.wait_for(api.send(update, chat_id), args.timeout))
+                    except asyncio.TimeoutError:
+                        timeouts += 1
+                        break
+                    if args.think:
+                        await asyncio.sleep(args.think)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(n) for n in range(args.users)))
+    elapsed = time.perf_counter() - t0
+    rss_peak = rss_mb()
+
+    os.kill(os.getpid(), signal.SIGINT)  # main.main() stops on SIGINT exactly as in production
+    await main_task
+    await smtp.stop(); await api.stop()
+
+    every = [v for vs in latencies.values() for v in vs]
+    ms = lambda v: round(v * 1000, 1)
+    return {
+        "users": args.users, "concurrency": args.concurrency, "blocking_sheets": args.blocking_sheets,
+        "sheets_latency": args.sheets_latency, "updates": len(every), "timeouts": timeouts,
+        "elapsed_sec": round(elapsed, 2), "updates_per_sec": round(len(every) / elapsed, 1) if elapsed else 0,
+        "latency_ms": {"p50": ms(percentile(every, 50)), "p95": ms(percentile(every, 95)),
+                       "p99": ms(percentile(every, 99)), "max": ms(max(every, default=0))},
+        "steps_ms": {k: {"n": len(v), "p50": ms(percentile(v, 50)), "p95": ms(percentile(v, 95)),
+                         "p99": ms(percentile(v, 99))} for k, v in sorted(latencies.items())},
+        "rss_mb": {"start": round(rss_start, 1), "end": round(rss_peak, 1)},
+        "sheets_rows": len(sheets.sh.rows), "sheets_calls": sheets.sh.calls, "emails": len(smtp.messages),
+        "api_calls": dict(api.calls), "api_429": api.rejected,
+        "admin_messages": len(api.sent.get(int(os.environ["ADMIN_CHAT_ID"]), [])),
+    }
+
+def print_report(r: dict):
+    print(f"users={r['users']} concurrency={r['concurrency']} blocking_sheets={r['blocking_sheets']} "
+          f"sheets_latency={r['sheets_latency']}s")
+    print(f"updates={r['updates']} timeouts={r['timeouts']} elapsed={r['elapsed_sec']}s "
+          f"-> {r['updates_per_sec']} updates/sec")
+    lat = r["latency_ms"]
+    print(f"latency ms: p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}")
+    print(f"{'step':<12}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for step, s in r["steps_ms"].items():
+        print(f"{step:<12}{s['n']:>7}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}")
+    print(f"rss MB: start={r['rss_mb']['start']} end={r['rss_mb']['end']}  "
+          f"sheets rows={r['sheets_rows']} calls={r['sheets_calls']}  emails={r['emails']}  api 429s={r['api_429']}  "
+          f"admin messages={r['admin_messages']}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="sunera-bench-") as workdir:
+        configure_env(args, workdir)
+        report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# bench/stubs.py
+import asyncio, threading, time
+from typing import List, Optional
+
+class StubWorksheet:
+    """gspread.Worksheet stand-in. Calls block for ``latency`` seconds, like the real HTTP client."""
+
+    def __init__(self, latency: float = 0.3, title: str = "Leads", id: int = 0):
+        self.latency = latency
+        self.title = title
+        self.id = id
+        self.rows: List[List[str]] = []
+        self.calls = 0
+        self.deleted = False
+        self._lock = threading.Lock()
+
+    @property
+    def row_count(self) -> int:
+        return max(1, len(self.rows))
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.deleted:
+            raise LookupError(f"worksheet {self.title!r} was deleted")
+
+    def row_values(self, n: int):
+        self._call()
+        return self.rows[n - 1] if len(self.rows) >= n else []
+
+    def append_row(self, row, **kw):
+        self._call()
+        self.rows.append(list(row))
+        return {"updates": {"updatedRange": f"{self.title}!A{len(self.rows)}:I{len(self.rows)}"}}
+
+    def append_rows(self, rows, **kw):
+        self._call()
+        start = len(self.rows) + 1
+        self.rows.extend(list(r) for r in rows)
+        return {"updates": {"updatedRange": f"{self.title}!A{start}:I{len(self.rows)}"}}
+
+    def batch_get(self, ranges, **kw):
+        self._call()
+        out = []
+        for rng in ranges:  # only whole-column ranges like "G2:G"
+            col = ord(rng[0]) - ord("A")
+            start = int(rng.split(":")[0][1:])
+            out.append([[r[col]] if col < len(r) and r[col] != "" else [] for r in self.rows[start - 1:]])
+        return out
+
+    def batch_update(self, data, **kw):
+        self._call()
+        for item in data:  # "A5:I5"
+            n = int(item["range"].split(":")[0][1:])
+            while len(self.rows) < n:
+                self.rows.append([])
+            self.rows[n - 1] = list(item["values"][0])
+        return {"totalUpdatedRows": len(data)}
+
+    def get(self, rng, **kw):
+        self._call()
+        first, last = (int(a[1:]) for a in rng.split(":"))  # only "A2:I5001"
+        return [list(r) for r in self.rows[first - 1:last]]
+
+    def col_values(self, col: int):
+        self._call()
+        values = [r[col - 1] if col <= len(r) else "" for r in self.rows]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def get_all_values(self):
+        self._call()
+        return [list(r) for r in self.rows]
+
+class StubSpreadsheet:
+    """gspread.Spreadsheet stand-in holding :class:`StubWorksheet` tabs; only what SheetClient uses."""
+
+    def __init__(self, latency: float = 0.3):
+        self.latency = latency
+        self.tabs: List[StubWorksheet] = []
+        self.meta_calls = 0
+
+    @property
+    def calls(self) -> int:
+        return self.meta_calls + sum(ws.calls for ws in self.tabs)
+
+    @property
+    def rows(self) -> List[List[str]]:
+        return [r for ws in self.tabs for r in ws.rows[1:]]  # leads, without headers
+
+    def _call(self):
+        self.meta_calls += 1
+        time.sleep(self.latency)
+
+    def worksheets(self, **kw):
+        self._call()
+        return list(self.tabs)
+
+    def worksheet(self, title: str):
+        self._call()
+        for ws in self.tabs:
+            if ws.title == title:
+                return ws
+        raise LookupError(title)
+
+    def get_worksheet_by_id(self, id: int):
+        self._call()
+        return next(ws for ws in self.tabs if ws.id == id)
+
+    def batch_update(self, body):
+        self._call()
+        new = None
+        for req in body["requests"]:  # addSheet + updateCells of its header
+            if "addSheet" in req:
+                props = req["addSheet"]["properties"]
+                new = StubWorksheet(self.latency, props["title"], props["sheetId"])
+                self.tabs.append(new)
+            elif "updateCells" in req and new is not None:
+                new.rows = [[v["userEnteredValue"]["stringValue"] for v in r["values"]]
+                            for r in req["updateCells"]["rows"]]
+        return {"replies": []}
+
+    def del_worksheet(self, ws):
+        self._call()
+        self.tabs.remove(ws)
+        ws.deleted = True
+
+class SmtpSink:
+    """Minimal SMTP server that accepts and stores messages, answering each command after ``latency``."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8025, latency: float = 0.0):
+        self.host, self.port = host, port
+        self.latency = latency
+        self.messages: List[dict] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._session, self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write((line + "\r\n").encode())
+        await writer.drain()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await self._reply(writer, "220 bench-smtp ready")
+        mail_from, rcpt = "", []
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                cmd = raw.decode(errors="replace").strip()
+                verb = cmd.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    await self._reply(writer, "250 bench-smtp")
+                elif verb == "MAIL":
+                    mail_from, rcpt = cmd[10:].strip("<> "), []
+                    await self._reply(writer, "250 OK")
+                elif verb == "RCPT":
+                    rcpt.append(cmd[8:].strip("<> "))
+                    await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    body = []
+                    while True:
+                        line = await reader.readline()
+                        if line in (b".\r\n", b".\n", b""):
+                            break
+                        body.append(line.decode(errors="replace"))
+                    self.messages.append({"from": mail_from, "to": rcpt, "data": "".join(body)})
+                    await self._reply(writer, "250 OK queued")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:  # RSET, NOOP, AUTH ... accepted without checks
+                    await self._reply(writer, "250 OK" if verb != "AUTH" else "235 OK")
+        finally:
+            writer.close()
@@ -4,6 +4,34 @@ import os
 # TELEGRAM
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "PASTE_TELEGRAM_TOKEN_HERE")
 ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "0"))  # 0 -> disabled
+ADMIN_ALERTS_MAX_QUEUE = int(os.getenv("ADMIN_ALERTS_MAX_QUEUE", "1000"))  # unsent lead alerts kept, oldest dropped first
+STATS_DAYS = int(os.getenv("STATS_DAYS", "30"))  # days of history /admin keeps in memory
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "https://api.telegram.org/bot")  # point at a fake API in tests
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))  # across chats; one chat's updates always run in order
+WORKERS = int(os.getenv("WORKERS", "1"))  # >1 -> front process + N worker processes sharded by chat id
+
+# OUTGOING MESSAGES: kept under Telegram's limits (~30 msg/s per bot, ~1/s per chat, 20/min per group);
+# with WORKERS>1 the global rate is split between workers. Rate 0 -> that limit is off
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "30"))
+OUTBOX_CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", "1"))
+OUTBOX_CHAT_BURST = float(os.getenv("OUTBOX_CHAT_BURST", "3"))
+OUTBOX_GROUP_RATE = float(os.getenv("OUTBOX_GROUP_RATE", str(20 / 60)))
+OUTBOX_GROUP_BURST = float(os.getenv("OUTBOX_GROUP_BURST", "5"))
+OUTBOX_MAX_RETRIES = int(os.getenv("OUTBOX_MAX_RETRIES", "3"))  # RetryAfter retries per call
+
+# UPDATE DELIVERY: "polling" or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # checked against X-Telegram-Bot-Api-Secret-Token; empty -> random per start (needs WEBHOOK_URL)
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))  # Telegram side, 1..100
+
+# METRICS: Prometheus text on http://METRICS_LISTEN:METRICS_PORT/metrics; 0 -> disabled
+# (with WORKERS>1, worker i serves on METRICS_PORT + 1 + i)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
 # COMPANY / CONTACTS
 COMPANY_NAME = os.getenv("COMPANY_NAME", "SUNERA Energy")
@@ -16,11 +44,35 @@ SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASS = os.getenv("SMTP_PASS", "")
-LEADS_EMAILS = [e.strip() for e in os.getenv("LEADS_EMAILS", "").split(",") if e.strip()]
+LEADS_EMAILS = [e.strip() for e in os.getenv("LEADS_EMAILS", "").split(",") if e.strip()]  # empty -> no lead emails
+MAIL_FROM = os.getenv("MAIL_FROM", "") or SMTP_USER or "bot@localhost"
+SMTP_CONNECTIONS = int(os.getenv("SMTP_CONNECTIONS", "1"))  # pooled persistent connections = parallel sends
+SMTP_TIMEOUT_SEC = float(os.getenv("SMTP_TIMEOUT_SEC", "15"))
+SMTP_IDLE_SEC = float(os.getenv("SMTP_IDLE_SEC", "60"))  # reconnect instead of reusing a connection idle this long
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))  # leads per digest email when they pile up
+MAIL_MAX_BACKOFF_SEC = float(os.getenv("MAIL_MAX_BACKOFF_SEC", "300"))
 
 # GOOGLE SHEETS
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "PUT_YOUR_SPREADSHEET_ID_HERE")
 GSHEET_NAME = os.getenv("GSHEET_NAME", "Leads")
+GSHEET_ROTATION = os.getenv("GSHEET_ROTATION", "monthly").lower()  # monthly -> "Leads 2026-10" worksheets; none -> one
+GSHEET_MAX_ROWS = int(os.getenv("GSHEET_MAX_ROWS", "50000"))  # leads per worksheet, then "Leads 2026-10 #2"; 0 -> no cap
+GSHEET_ARCHIVE_DIR = os.getenv("GSHEET_ARCHIVE_DIR", "data/archive")  # where `export.py archive` puts old worksheets
+SHEETS_BATCH_SIZE = int(os.getenv("SHEETS_BATCH_SIZE", "50"))  # rows per append_rows call
+SHEETS_FLUSH_INTERVAL_SEC = float(os.getenv("SHEETS_FLUSH_INTERVAL_SEC", "2"))
+SHEETS_MAX_BACKOFF_SEC = float(os.getenv("SHEETS_MAX_BACKOFF_SEC", "60"))
+SHEETS_SHUTDOWN_TIMEOUT_SEC = float(os.getenv("SHEETS_SHUTDOWN_TIMEOUT_SEC", "15"))
+
+# LOCAL LEAD JOURNAL (every lead is stored here before it is shipped to Sheets)
+LEADS_JOURNAL_PATH = os.getenv("LEADS_JOURNAL_PATH", "data/leads.sqlite3")
+JOURNAL_COMMIT_DELAY_MS = float(os.getenv("JOURNAL_COMMIT_DELAY_MS", "5"))  # group-commit window
+DEDUP_WINDOW_SEC = float(os.getenv("DEDUP_WINDOW_SEC", str(24 * 3600)))  # same phone or user within it -> update; 0 -> off
+DEDUP_MAX_KEYS = int(os.getenv("DEDUP_MAX_KEYS", "100000"))
+
+# BOT STATE (user_data + conversation states); empty path -> in-memory only
+PERSISTENCE_PATH = os.getenv("PERSISTENCE_PATH", "data/state.sqlite3")
+PERSISTENCE_FLUSH_SEC = float(os.getenv("PERSISTENCE_FLUSH_SEC", "5"))
+PERSISTENCE_CACHE_USERS = int(os.getenv("PERSISTENCE_CACHE_USERS", "50000"))  # per-user bookkeeping kept, LRU-evicted
 
 def get_gsheets_credentials_dict():
     import json, os
@@ -44,8 +96,29 @@ SUPPORTED_LANGS = ["ru", "en", "es", "pl", "de", "uk"]
 DEFAULT_LANG = os.getenv("DEFAULT_LANG", "ru").lower()
 if DEFAULT_LANG not in SUPPORTED_LANGS:
     DEFAULT_LANG = "ru"
+# language detection from users' first free-text messages, unless they pick one with /lang
+LANGDETECT_MAX_TRIES = int(os.getenv("LANGDETECT_MAX_TRIES", "3"))  # detections per user until a confident one; 0 -> off
+LANGDETECT_MIN_CHARS = int(os.getenv("LANGDETECT_MIN_CHARS", "12"))  # letters; shorter messages are not worth a try
+LANGDETECT_MIN_PROB = float(os.getenv("LANGDETECT_MIN_PROB", "0.8"))
+LANGDETECT_CACHE_SIZE = int(os.getenv("LANGDETECT_CACHE_SIZE", "50000"))  # users remembered
 
 # TUNABLES
-ANTI_FLOOD_WINDOW_SEC = int(os.getenv("ANTI_FLOOD_WINDOW_SEC", "1"))
+ANTI_FLOOD_WINDOW_SEC = float(os.getenv("ANTI_FLOOD_WINDOW_SEC", "1"))  # one token per window per user
+ANTI_FLOOD_BURST = float(os.getenv("ANTI_FLOOD_BURST", "5"))  # updates a user may send back-to-back
+ANTI_FLOOD_CHAT_RATE = float(os.getenv("ANTI_FLOOD_CHAT_RATE", "3"))  # updates/sec per group chat
+ANTI_FLOOD_CHAT_BURST = float(os.getenv("ANTI_FLOOD_CHAT_BURST", "15"))
+ANTI_FLOOD_MAX_KEYS = int(os.getenv("ANTI_FLOOD_MAX_KEYS", "50000"))  # per limiter, LRU-evicted
 SOLAR_COST_PER_KW = float(os.getenv("SOLAR_COST_PER_KW", "1000"))
 SOLAR_PERFORMANCE = float(os.getenv("SOLAR_PERFORMANCE", "0.75"))
+SOLAR_REGIONS = ("flat", "PL", "DE", "UA", "ES")  # monthly PSH profiles in utils/solar.py
+SOLAR_REGION = {r.lower(): r for r in SOLAR_REGIONS}.get(os.getenv("SOLAR_REGION", "flat").strip().lower())  # for the bot's estimate
+if SOLAR_REGION is None:  # else every solar request would answer solar_badfmt
+    raise ValueError(f"SOLAR_REGION must be one of {', '.join(SOLAR_REGIONS)}, got {os.getenv('SOLAR_REGION')!r}")
+SOLAR_TARIFF_ESCALATION = float(os.getenv("SOLAR_TARIFF_ESCALATION", "0"))  # yearly tariff growth, 0.03 = 3%
+SOLAR_DEGRADATION = float(os.getenv("SOLAR_DEGRADATION", "0"))  # yearly panel output loss, 0.005 = 0.5%
+SOLAR_EXPORT_RATIO = float(os.getenv("SOLAR_EXPORT_RATIO", "1"))  # value of exported kWh vs tariff (1 = net metering)
+SOLAR_HORIZON_YEARS = int(os.getenv("SOLAR_HORIZON_YEARS", "25"))
+SOLAR_CACHE_SIZE = int(os.getenv("SOLAR_CACHE_SIZE", "256"))  # cached sweeps (quantized inputs); a full default sweep holds ~300 KB
+LOAN_CACHE_SIZE = int(os.getenv("LOAN_CACHE_SIZE", "256"))  # cached schedule batches; 10 offers x 600 months hold ~144 KB (~37 MB worst case)
+PHONE_CACHE_SIZE = int(os.getenv("PHONE_CACHE_SIZE", "10000"))  # normalized numbers kept in memory
+PHONE_WORKERS = int(os.getenv("PHONE_WORKERS", "2"))  # threads for cold phonenumbers parses
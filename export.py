@@ -0,0 +1,296 @@
+# export.py
+"""Export leads or report on them without loading everything into memory.
+
+    python export.py export -o leads.csv --since 2026-01-01 --lang ru,uk
+    python export.py export --source sheets --format parquet -o leads.parquet
+    python export.py report --by day,lang --since 2026-06-01
+    python export.py archive --keep 3 --delete
+    python export.py phones --since 2026-01-01 -o bad_phones.csv
+
+Leads are streamed from the local journal (LEADS_JOURNAL_PATH and, with
+WORKERS>1, every worker's shard) or from the Google Sheet in ranges of
+--page-size rows, filtered by date/lang/city and written row by row
+(Parquet in row groups, needs pyarrow). ``report`` counts leads per group
+and keeps only the counters. ``archive`` copies all but the newest --keep
+lead worksheets to GSHEET_ARCHIVE_DIR and, with --delete, removes them
+from the spreadsheet. ``phones`` re-validates the phone of every matching
+lead and lists those that are not valid E.164.
+"""
+import argparse, csv, glob, json, os, sqlite3, sys, time
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from utils.journal import COLUMNS
+
+FORMATS = ["csv", "jsonl", "parquet"]
+GROUPS = {
+    "day": lambda lead: _day(lead["ts"]),
+    "month": lambda lead: _day(lead["ts"])[:7],
+    "lang": lambda lead: lead["lang"],
+    "city": lambda lead: lead["city"].strip().casefold(),
+    "type": lambda lead: lead["type"],
+}
+
+def _day(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+def _date(value: str, end: bool = False) -> int:
+    """YYYY-MM-DD (UTC; its first or, with ``end``, last second) or a unix timestamp."""
+    try:
+        return int(value)
+    except ValueError:
+        day = int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+        return day + 86399 if end else day
+
+def _lead(values: List[str]) -> Optional[dict]:
+    lead = dict(zip(COLUMNS, (str(v) for v in values)))
+    try:
+        lead["ts"] = int(float(lead.get("ts", "")))
+    except ValueError:
+        return None  # header or a hand-edited row
+    for c in COLUMNS:
+        lead.setdefault(c, "")
+    return lead
+
+# ===== sources =====
+
+# The newest version of every lead: an update row points (dup_of) at the row it replaced,
+# which may itself be an update, so chains are followed back to the first submission.
+LATEST_SQL = f"""
+WITH RECURSIVE chain(id, root) AS (
+    SELECT id, id FROM leads WHERE dup_of IS NULL
+    UNION ALL
+    SELECT l.id, c.root FROM leads l JOIN chain c ON l.dup_of = c.id
+)
+SELECT {", ".join("l." + c for c in COLUMNS)} FROM leads l
+JOIN (SELECT root, MAX(id) AS last FROM chain GROUP BY root) v ON l.id = v.last
+WHERE CAST(l.ts AS INTEGER) BETWEEN ? AND ? ORDER BY v.root
+"""
+ALL_SQL = f"SELECT {', '.join(COLUMNS)} FROM leads WHERE CAST(ts AS INTEGER) BETWEEN ? AND ? ORDER BY id"
+
+def journal_paths(path: str = config.LEADS_JOURNAL_PATH) -> List[str]:
+    """The journal and its worker shards (data/leads-0.sqlite3, ...) that exist."""
+    root, ext = os.path.splitext(path)
+    return [p for p in [path] + sorted(glob.glob(f"{glob.escape(root)}-[0-9]*{ext}")) if os.path.exists(p)]
+
+def from_journal(paths: List[str], since: int, until: int, all_versions: bool = False,
+                 page: int = 5000) -> Iterator[dict]:
+    """Read-only: WAL lets this run next to a live bot without blocking its writes."""
+    for path in paths:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            cur = conn.execute(ALL_SQL if all_versions else LATEST_SQL, (since, until))
+            while True:
+                rows = cur.fetchmany(page)
+                if not rows:
+                    break
+                for values in rows:
+                    lead = _lead(values)
+                    if lead:
+                        yield lead
+        finally:
+            conn.close()
+
+def _sheets():
+    from utils.sheets import sheets
+    if not sheets.sh and not sheets.init():
+        raise SystemExit("Google Sheets is not configured or not reachable")
+    return sheets
+
+def read_worksheet(ws, page: int = 5000) -> Iterator[dict]:
+    """One worksheet in ranges of ``page`` rows; stops at the first short page."""
+    from utils.sheets import LAST_COL
+    start = 2  # row 1 is the header
+    while True:
+        values = ws.get(f"A{start}:{LAST_COL}{start + page - 1}")
+        for row in values:
+            lead = _lead(row)
+            if lead:
+                yield lead
+        if len(values) < page:
+            return
+        start += page
+
+def from_sheets(since: int, until: int, page: int = 5000) -> Iterator[dict]:
+    """Every lead worksheet, oldest first, skipping monthly shards outside [since, until]."""
+    from utils.sheets import shard_key
+    client = _sheets()
+    first, last = _day(since)[:7], _day(min(until, 253402300799))[:7]
+    for title in client.shards():
+        month = shard_key(title, client.name)[0]
+        if not month or first <= month <= last:
+            yield from read_worksheet(client.worksheet(title), page)
+
+def make_filter(since: int, until: int, langs: List[str], cities: List[str]) -> Callable[[dict], bool]:
+    langs_ = {l.lower() for l in langs}
+    cities_ = {c.strip().casefold() for c in cities}
+
+    def keep(lead: dict) -> bool:
+        return (since <= lead["ts"] <= until
+                and (not langs_ or lead["lang"].lower() in langs_)
+                and (not cities_ or lead["city"].strip().casefold() in cities_))
+    return keep
+
+# ===== writers =====
+
+def write_csv(leads: Iterable[dict], out) -> int:
+    w = csv.writer(out)
+    w.writerow(COLUMNS)
+    n = 0
+    for n, lead in enumerate(leads, 1):
+        w.writerow([lead[c] for c in COLUMNS])
+    return n
+
+def write_jsonl(leads: Iterable[dict], out) -> int:
+    n = 0
+    for n, lead in enumerate(leads, 1):
+        out.write(json.dumps(lead, ensure_ascii=False) + "\n")
+    return n
+
+def write_parquet(leads: Iterable[dict], path: str, row_group: int = 10000) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+    schema = pa.schema([(c, pa.int64() if c == "ts" else pa.string()) for c in COLUMNS])
+    n, batch = 0, {c: [] for c in COLUMNS}
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for lead in leads:
+            for c in COLUMNS:
+                batch[c].append(lead[c])
+            n += 1
+            if n % row_group == 0:
+                writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+                batch = {c: [] for c in COLUMNS}
+        if n % row_group or not n:
+            writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+    return n
+
+def write(leads: Iterable[dict], fmt: str, path: str) -> int:
+    if fmt == "parquet":
+        return write_parquet(leads, path)
+    writer = write_csv if fmt == "csv" else write_jsonl
+    if path == "-":
+        return writer(leads, sys.stdout)
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        return writer(leads, out)
+
+def archive(keep: int, out_dir: str, fmt: str, delete: bool, page: int = 5000):
+    """Copy all but the newest ``keep`` lead worksheets to ``out_dir``, one file each; optionally delete them."""
+    client = _sheets()
+    os.makedirs(out_dir, exist_ok=True)
+    for title in client.shards()[:-keep]:
+        path = os.path.join(out_dir, f"{title.replace(' #', '_part').replace(' ', '_')}.{fmt}")
+        t0 = time.perf_counter()
+        n = write(read_worksheet(client.worksheet(title), page), fmt, path + ".tmp")
+        os.replace(path + ".tmp", path)  # a file under the final name is always complete
+        print(f"{title}: {n} leads -> {path} in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        if delete:
+            client.remove_shard(title)
+
+def check_phones(leads: Iterable[dict], out, chunk: int = 5000) -> Tuple[int, int]:
+    """Write ts, chat_id, name, stored phone and its normalized form (empty if invalid) of every lead
+    whose phone is not valid E.164; returns (leads checked, leads listed)."""
+    from utils.validators import revalidate_phones
+    w = csv.writer(out)
+    w.writerow(["ts", "chat_id", "name", "phone", "normalized"])
+    leads, n, bad = iter(leads), 0, 0
+    while True:
+        batch = list(islice(leads, chunk))
+        if not batch:
+            return n, bad
+        n += len(batch)
+        for i, raw, norm in revalidate_phones(lead["phone"] for lead in batch):
+            w.writerow([batch[i]["ts"], batch[i]["chat_id"], batch[i]["name"], raw, norm or ""])
+            bad += 1
+
+def report(leads: Iterable[dict], by: List[str]) -> Dict[tuple, int]:
+    keys = [GROUPS[g] for g in by]
+    return Counter(tuple(k(lead) for k in keys) for lead in leads)
+
+# ===== CLI =====
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = p.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--source", choices=["journal", "sheets"], default="journal")
+    common.add_argument("--journal", action="append", help="journal file(s); default: LEADS_JOURNAL_PATH and its shards")
+    common.add_argument("--all-versions", action="store_true", help="journal: every submission, not just the latest per lead")
+    common.add_argument("--since", type=_date, default=0, help="YYYY-MM-DD (UTC) or unix time, inclusive")
+    common.add_argument("--until", type=lambda v: _date(v, end=True), default=2 ** 62, help="YYYY-MM-DD (UTC, whole day) or unix time, inclusive")
+    common.add_argument("--lang", default="", help="comma-separated, e.g. ru,uk")
+    common.add_argument("--city", default="", help="comma-separated, case-insensitive")
+    common.add_argument("--page-size", type=int, default=5000, help="rows per SQLite fetch / Sheets range read")
+    e = sub.add_parser("export", parents=[common], help="write matching leads")
+    e.add_argument("--format", choices=FORMATS, default=None, help="default: from the -o extension, else csv")
+    e.add_argument("-o", "--output", default="-", help="file, or - for stdout (csv/jsonl)")
+    r = sub.add_parser("report", parents=[common], help="count matching leads per group")
+    r.add_argument("--by", default="day,lang", help="comma-separated: " + ",".join(GROUPS))
+    ph = sub.add_parser("phones", parents=[common], help="list leads whose phone is not valid E.164")
+    ph.add_argument("-o", "--output", default="-", help="CSV file, or - for stdout")
+    a = sub.add_parser("archive", help="move old lead worksheets out of the spreadsheet into local files")
+    a.add_argument("--keep", type=int, default=3, help="newest worksheets left alone (at least 1: the one being written)")
+    a.add_argument("--dir", default=config.GSHEET_ARCHIVE_DIR)
+    a.add_argument("--format", choices=FORMATS, default="csv", help="parquet needs pyarrow")
+    a.add_argument("--delete", action="store_true", help="delete each worksheet once its file is written")
+    a.add_argument("--page-size", type=int, default=5000, help="rows per Sheets range read")
+    args = p.parse_args(argv)
+    if args.command == "archive":
+        if args.keep < 1:
+            p.error("--keep must be at least 1")
+        return args
+    if args.command == "export" and args.format is None:
+        ext = os.path.splitext(args.output)[1].lstrip(".").lower()
+        args.format = ext if ext in FORMATS else "csv"
+    if args.command == "export" and args.format == "parquet" and args.output == "-":
+        p.error("parquet needs an output file (-o)")
+    if args.command == "report":
+        args.by = [g.strip() for g in args.by.split(",") if g.strip()]
+        if not args.by or set(args.by) - set(GROUPS):
+            p.error(f"--by takes {', '.join(GROUPS)}")
+    return args
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "archive":
+        archive(args.keep, args.dir, args.format, args.delete, args.page_size)
+        return
+    if args.source == "journal":
+        paths = args.journal or journal_paths()
+        if not paths:
+            raise SystemExit(f"No lead journal at {config.LEADS_JOURNAL_PATH}")
+        leads = from_journal(paths, args.since, args.until, args.all_versions, args.page_size)
+    else:
+        leads = from_sheets(args.since, args.until, args.page_size)
+    leads = filter(make_filter(args.since, args.until, _split(args.lang), _split(args.city)), leads)
+
+    t0 = time.perf_counter()
+    if args.command == "phones":
+        if args.output == "-":
+            n, bad = check_phones(leads, sys.stdout)
+        else:
+            with open(args.output, "w", encoding="utf-8", newline="") as out:
+                n, bad = check_phones(leads, out)
+        print(f"{bad} of {n} leads have a phone that is not valid E.164, {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        return
+    if args.command == "report":
+        w = csv.writer(sys.stdout)
+        w.writerow(args.by + ["leads"])
+        counts = report(leads, args.by)
+        for key, n in sorted(counts.items()):
+            w.writerow([*key, n])
+        print(f"{sum(counts.values())} leads in {len(counts)} groups, {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        return
+    n = write(leads, args.format, args.output)
+    print(f"{n} leads exported in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,62 @@
 # handlers/credit.py
 from telegram import Update
 from telegram.ext import ConversationHandler, MessageHandler, CommandHandler, filters
-from utils.common import pick_lang, t, loan_calc
+from utils.common import pick_lang, t
+from utils.router import IntentFilter
+from utils.metrics import timed
+from utils.stats import stats
+import config
 
-ASK = range(1)
+ASK, = range(1)
 
+@timed
 async def start_credit(update: Update, context):
     lang = context.user_data.get("lang", pick_lang(update.effective_user.language_code))
     await update.message.reply_text(t("credit_prompt", lang))
+    stats.calc("credit", "open")
     return ASK
 
+def _fmt(x: float):
+    return int(x) if x == int(x) else x
+
+def _compare_text(res, lang: str) -> str:
+    rows = []
+    for i, o in enumerate(res.offers):
+        m, _, over = res.summary(i)
+        balloon = t("credit_balloon", lang).format(balloon=_fmt(o.balloon)) if o.balloon else ""
+        rows.append(t("credit_row", lang).format(n=i + 1, amount=_fmt(o.amount), months=o.months, rate=_fmt(o.rate_pct),
+                                                 balloon=balloon, monthly=m, over=over))
+    rows.append(t("credit_best", lang).format(n=res.best() + 1))
+    return "\n".join(rows)
+
+@timed
 async def credit_parse(update: Update, context):
     lang = context.user_data.get("lang", pick_lang(update.effective_user.language_code))
-    parts = (update.message.text or "").replace(",", ".").split()
-    if len(parts) != 3:
-        await update.message.reply_text(t("credit_badfmt", lang)); return ASK
+    from utils.loans import parse_offers, compare  # numpy is imported on the first calculation, not at bot start
     try:
-        amount = float(parts[0]); years = float(parts[1]); rate = float(parts[2])
-        m, total, over = loan_calc(amount, years, rate)
-        await update.message.reply_text(t("credit_result", lang).format(monthly=m, total=total, over=over))
-        return ConversationHandler.END
-    except Exception:
+        res = compare(parse_offers(update.message.text or ""))
+    except ValueError:
         await update.message.reply_text(t("credit_badfmt", lang))
+        stats.calc("credit", "bad")
         return ASK
+    if len(res.offers) == 1:
+        m, total, over = res.summary()
+        await update.message.reply_text(t("credit_result", lang).format(monthly=m, total=total, over=over))
+    else:
+        await update.message.reply_text(_compare_text(res, lang))
+    stats.calc("credit", "ok" if len(res.offers) == 1 else "compare")
+    return ConversationHandler.END
 
+@timed
 async def credit_cancel(update: Update, context):
     await update.message.reply_text("❌")
     return ConversationHandler.END
 
 def credit_conv_handler() -> ConversationHandler:
-    pattern = r"(Кредит|Loan|crédito|Kredyt|Kredit|Кредитний)"
     return ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex(pattern) & ~filters.COMMAND, start_credit)],
+        entry_points=[MessageHandler(IntentFilter("credit") & ~filters.COMMAND, start_credit)],
         states={ASK: [MessageHandler(filters.TEXT & ~filters.COMMAND, credit_parse)]},
         fallbacks=[CommandHandler("cancel", credit_cancel)],
         name="credit_conv",
-        persistent=False,
+        persistent=bool(config.PERSISTENCE_PATH),
     )
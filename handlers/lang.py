@@ -1,7 +1,9 @@
 # handlers/lang.py
+from functools import lru_cache
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler
 from utils.common import t
+from utils.metrics import timed
 import config
 
 LANG_LABELS = {
@@ -13,6 +15,7 @@ LANG_LABELS = {
     "uk": "Українська 🇺🇦",
 }
 
+@lru_cache(maxsize=16)
 def build_lang_kb(curr: str):
     rows = []
     row = []
@@ -24,10 +27,12 @@ def build_lang_kb(curr: str):
     if row: rows.append(row)
     return InlineKeyboardMarkup(rows)
 
+@timed
 async def lang_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = context.user_data.get("lang", config.DEFAULT_LANG)
     await update.message.reply_text("Choose language / Выберите язык:", reply_markup=build_lang_kb(lang))
 
+@timed
 async def lang_pick_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
@@ -38,6 +43,7 @@ async def lang_pick_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if new_lang not in config.SUPPORTED_LANGS:
         return
     context.user_data["lang"] = new_lang
+    context.user_data["lang_manual"] = True  # language detection leaves it alone from now on
     await q.edit_message_text("✅ Language updated.", reply_markup=build_lang_kb(new_lang))
     from utils.common import main_menu, t
     await q.message.chat.send_message(t("welcome", new_lang), reply_markup=main_menu(new_lang))
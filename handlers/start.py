@@ -1,7 +1,14 @@
 from telegram import Update
 from telegram.ext import ContextTypes
+from utils.common import main_menu, pick_lang, t
+from utils.langid import language_detector
+from utils.router import router
+from utils.stats import stats
+from utils.metrics import timed
+import config
 
 # ===== команда /start =====
+@timed
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "👋 Привет! Я бот компании SUNERA.\n"
@@ -9,26 +16,56 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 # ===== команда /id =====
+@timed
 async def cmd_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         f"🆔 Ваш Telegram ID: {update.effective_user.id}"
     )
 
 # ===== команда /admin =====
+@timed
 async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    # здесь можно сделать проверку admin_id из config
-    await update.message.reply_text(f"⚡ Админ-панель недоступна пользователю {user_id}")
+    # только в админском чате (или в личке админа, если ADMIN_CHAT_ID — его id), не в чужих группах
+    if not config.ADMIN_CHAT_ID or update.effective_chat.id != config.ADMIN_CHAT_ID:
+        await update.message.reply_text(f"⚡ Админ-панель недоступна пользователю {user_id}")
+        return
+    # /admin 30 — за сколько дней; всё из счётчиков в памяти, таблица не читается
+    days = int(context.args[0]) if context.args and context.args[0].isdigit() else 7
+    await update.message.reply_text(stats.report(days))
 
 # ===== обработка обычных текстов =====
+@timed
 async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    text = update.message.text.strip().lower()
+    # сценарии (заявка/кредит/солнце) перехватывают свои кнопки раньше — сюда приходит остальное
+    text = update.message.text.strip()
+    intent = router.route(text)
+    lang = context.user_data.get("lang", pick_lang(update.effective_user.language_code))
+    switched = False
+    # свободный текст подсказывает язык, если пользователь не выбрал его сам через /lang
+    if intent is None and not context.user_data.get("lang_manual"):
+        detected = await language_detector.for_user(update.effective_user.id, text)
+        if detected and detected != lang:
+            context.user_data["lang"] = lang = detected
+            switched = True
 
-    if "цена" in text or "стоимость" in text:
+    if intent in ("about", "services"):
+        await update.message.reply_text(t("about_text", lang))
+    elif intent == "site":
+        await update.message.reply_text(f"🌐 {config.WEBSITE_URL}")
+    elif intent == "whatsapp":
+        await update.message.reply_text(f"💬 https://wa.me/{config.WHATSAPP_NUMBER}")
+    elif intent == "call":
+        await update.message.reply_text(f"📞 {config.COMPANY_PHONE}")
+    elif intent == "lang":
+        from handlers.lang import lang_menu
+        await lang_menu(update, context)
+    elif intent == "price":
         await update.message.reply_text("💶 Наша команда свяжется с вами для расчёта стоимости.")
-    elif "контакт" in text or "телефон" in text:
+    elif intent == "contact":
         await update.message.reply_text("📞 Вы можете позвонить нам: +49 15510 361517")
     else:
         await update.message.reply_text(
-            "🙏 Спасибо за сообщение! Наш менеджер ответит вам в ближайшее время."
+            "🙏 Спасибо за сообщение! Наш менеджер ответит вам в ближайшее время.",
+            reply_markup=main_menu(lang) if switched else None,
         )
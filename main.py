@@ -1,7 +1,14 @@
+import time
+import secrets
+_T0 = time.perf_counter()  # до остальных импортов — время старта считаем вместе с ними
+
 import logging
 import asyncio
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+import signal
+from telegram import Update
+from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters
 
+import config
 from config import TELEGRAM_BOT_TOKEN
 # ===== ИСПРАВЛЕННЫЕ ИМПОРТЫ =====
 from handlers.start import cmd_start, cmd_id, cmd_admin, on_text
@@ -9,6 +16,14 @@ from handlers.form import form_conv_handler
 from handlers.credit import credit_conv_handler
 from handlers.solar import solar_conv_handler
 from handlers.lang import lang_handlers
+from utils.sheets import sheets
+from utils.ratelimit import flood_guard, OutboundLimiter
+from utils.updates import ChatOrderedUpdateProcessor
+from utils.alerts import admin_alerts
+from utils.mailer import mailer
+from utils.metrics import TimedRequest, MetricsServer, STARTUP_SECONDS
+from utils.common import check_texts
+from utils.texts import TEXTS
 
 # ======== НАСТРОЙКА ЛОГГИРОВАНИЯ ========
 logging.basicConfig(
@@ -16,38 +31,184 @@ logging.basicConfig(
     level=logging.INFO
 )
 log = logging.getLogger("sunera-bot")
+STARTUP_SECONDS.set(time.perf_counter() - _T0, "imports")
 
-# ======== ТОЧКА ВХОДА ========
-async def main():
-    """Запуск Telegram-бота"""
+# ======== ОЖИДАНИЕ СИГНАЛА ОСТАНОВКИ ========
+async def wait_for_stop():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C отменит задачу через asyncio.run
+    await stop.wait()
 
-    if not TELEGRAM_BOT_TOKEN:
-        log.error("❌ TELEGRAM_BOT_TOKEN не найден в переменных окружения!")
-        return
+# ======== ПРОГРЕВ ========
+async def warm_up():
+    """Тяжёлые зависимости (phonenumbers, numpy, профили langdetect, gspread + авторизация) грузим в фоне, когда бот уже отвечает"""
+    from utils import validators
+    from utils.langid import language_detector
+    t0 = time.perf_counter()
+    await asyncio.to_thread(validators.warm_up)
+    if language_detector.enabled:
+        await asyncio.to_thread(language_detector.load)
+    await asyncio.to_thread(__import__, "utils.solar")
+    await asyncio.to_thread(__import__, "utils.loans")
+    t1 = time.perf_counter()
+    ok = await sheets.ensure_ready()
+    t2 = time.perf_counter()
+    STARTUP_SECONDS.set(t1 - t0, "warm_up_libs")
+    STARTUP_SECONDS.set(t2 - t1, "warm_up_sheets")
+    log.info("Прогрев: phonenumbers + numpy + langdetect %.0f мс, Google Sheets %.0f мс (%s)",
+             (t1 - t0) * 1000, (t2 - t1) * 1000, "ok" if ok else "не настроен")
 
-    # создаём приложение
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+def mark_ready():
+    ready = time.perf_counter() - _T0
+    STARTUP_SECONDS.set(ready, "ready")
+    log.info("⏱ Готов принимать апдейты через %.0f мс после запуска", ready * 1000)
+    return asyncio.create_task(warm_up(), name="warm-up")
+
+# ======== СБОРКА ПРИЛОЖЕНИЯ ========
+def build_application(updater: bool = True, persistence_path: str = config.PERSISTENCE_PATH) -> Application:
+    """Application со всеми обработчиками (общая для polling, webhook и воркеров)"""
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .base_url(config.TELEGRAM_API_BASE_URL)
+        .request(TimedRequest(connection_pool_size=256))  # пул как у PTB по умолчанию + замер задержек
+        .rate_limiter(OutboundLimiter(  # лимиты Telegram: общий делим между процессами-воркерами
+            global_rate=config.OUTBOX_GLOBAL_RATE / max(1, config.WORKERS),
+            chat_rate=config.OUTBOX_CHAT_RATE, chat_burst=config.OUTBOX_CHAT_BURST,
+            group_rate=config.OUTBOX_GROUP_RATE, group_burst=config.OUTBOX_GROUP_BURST,
+            max_retries=config.OUTBOX_MAX_RETRIES))
+        .concurrent_updates(ChatOrderedUpdateProcessor(max(1, config.MAX_CONCURRENT_UPDATES)))  # чаты параллельно, внутри чата по порядку
+    )
+    if persistence_path:
+        from utils.persistence import SQLitePersistence
+        builder = builder.persistence(SQLitePersistence(persistence_path))
+    if not updater:
+        builder = builder.updater(None)  # обновления приходят извне: webhook или фронт-процесс
+    application = builder.build()
+
+    # анти-флуд: группа -1 срабатывает раньше всех, лишние апдейты дальше не идут
+    application.add_handler(TypeHandler(Update, flood_guard), group=-1)
 
     # команды
     application.add_handler(CommandHandler("start", cmd_start))
     application.add_handler(CommandHandler("id", cmd_id))
     application.add_handler(CommandHandler("admin", cmd_admin))
 
-    # текстовые сообщения
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
-
-    # разговорные сценарии
-    application.add_handler(form_conv_handler)
-    application.add_handler(credit_conv_handler)
-    application.add_handler(solar_conv_handler)
+    # разговорные сценарии (входы — по интенту из utils.router)
+    application.add_handler(form_conv_handler())
+    application.add_handler(credit_conv_handler())
+    application.add_handler(solar_conv_handler())
 
     # языковые команды
-    for handler in lang_handlers:
+    for handler in lang_handlers():
         application.add_handler(handler)
 
-    log.info("🤖 Sunera Telegram Bot запущен и ждёт сообщения...")
+    # текстовые сообщения — последними: в группе срабатывает только первый подходящий обработчик
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
+
+    return application
+
+# ======== WEBHOOK ========
+async def start_webhook(bot, sink, status):
+    """Поднимает aiohttp-сервер; sink получает сырой dict каждого апдейта.
+    Без секрета любой, кто знает путь, мог бы подсовывать апдейты (и заявки), поэтому он обязателен:
+    из WEBHOOK_SECRET или, если мы сами вызываем setWebhook, случайный на этот запуск"""
+    from utils.webhook import WebhookServer
+
+    secret = config.WEBHOOK_SECRET
+    if not secret:
+        if not config.WEBHOOK_URL:
+            raise RuntimeError("BOT_MODE=webhook без WEBHOOK_URL требует WEBHOOK_SECRET (тот же, что передан в setWebhook)")
+        secret = secrets.token_urlsafe(32)
+        log.info("WEBHOOK_SECRET не задан — для этого запуска сгенерирован случайный")
+    server = WebhookServer(
+        sink, config.WEBHOOK_PATH, secret, config.WEBHOOK_LISTEN, config.WEBHOOK_PORT,
+        status=status,
+    )
+    await server.start()
+    try:
+        if config.WEBHOOK_URL:
+            await bot.set_webhook(
+                url=f"{config.WEBHOOK_URL.rstrip('/')}/{config.WEBHOOK_PATH}",
+                secret_token=secret,
+                max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=True,
+            )
+        else:
+            log.warning("WEBHOOK_URL не задан — setWebhook не вызывается, ждём обновления на %s", server.path)
+    except BaseException:
+        await server.stop()
+        raise
+    return server
+
+# ======== ТОЧКА ВХОДА ========
+async def main():
+    """Запуск Telegram-бота"""
+
+    if not TELEGRAM_BOT_TOKEN:
+        log.error("❌ TELEGRAM_BOT_TOKEN не найден в переменных окружения!")
+        return
+
+    # проверка переводов: недостающие ключи и несовпадающие {плейсхолдеры}
+    for problem in check_texts(TEXTS, config.SUPPORTED_LANGS):
+        log.warning("texts: %s", problem)
+
+    # несколько процессов: фронт раздаёт апдейты воркерам по chat_id
+    if config.WORKERS > 1:
+        from utils.sharding import run_sharded
+        await run_sharded(config.WORKERS, wait_for_stop)
+        return
+
+    # создаём приложение
+    application = build_application(updater=config.BOT_MODE != "webhook")
+
+    metrics = MetricsServer(config.METRICS_LISTEN, config.METRICS_PORT) if config.METRICS_PORT else None
 
-    await application.run_polling(drop_pending_updates=True)
+    # run_polling() управляет своим event loop и не работает внутри asyncio.run,
+    # поэтому жизненный цикл ведём вручную — это даёт корректную остановку
+    async with application:
+        server = warm = None
+        # всё, что успело запуститься, останавливается в finally — даже если упал bind или setWebhook
+        try:
+            if metrics:
+                await metrics.start()
+            await sheets.start()
+            await admin_alerts.start(application.bot)
+            await mailer.start()
+            await application.start()
+            if config.BOT_MODE == "webhook":
+                async def feed(data: dict):
+                    await application.update_queue.put(Update.de_json(data, application.bot))
+                server = await start_webhook(
+                    application.bot, feed,
+                    lambda: {"mode": "webhook", "update_queue": application.update_queue.qsize()},
+                )
+            else:
+                await application.updater.start_polling(drop_pending_updates=True)
+            log.info("🤖 Sunera Telegram Bot запущен (%s) и ждёт сообщения...", config.BOT_MODE)
+            warm = mark_ready()
+            await wait_for_stop()
+        finally:
+            log.info("Остановка: дожидаемся отправки заявок в Google Sheets...")
+            if warm:
+                warm.cancel()
+            if server:
+                await server.stop()
+            elif application.updater and application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await admin_alerts.close()
+            await mailer.close()
+            await sheets.close()
+            if metrics:
+                await metrics.stop()
 
 if __name__ == "__main__":
     import telegram
@@ -0,0 +1,80 @@
+# tests/test_langid.py
+import asyncio
+import pytest
+from utils.langid import LanguageDetector
+
+def _detector(answers, **kw):
+    """A detector whose batches are answered from ``answers`` (text -> lang) and recorded."""
+    d = LanguageDetector(["en", "de", "pl"], batch_delay=0.001, **kw)
+    d.batches = []
+
+    def detect_many(texts):
+        d.batches.append(list(texts))
+        return [answers.get(t) for t in texts]
+
+    d.detect_many = detect_many
+    return d
+
+def test_a_confident_answer_is_cached_per_user():
+    d = _detector({"Guten Tag, ich brauche ein Angebot": "de"})
+
+    async def scenario():
+        first = await d.for_user(1, "Guten Tag, ich brauche ein Angebot")
+        again = await d.for_user(1, "Hello, I would like a quote please")
+        return first, again
+
+    assert asyncio.run(scenario()) == ("de", "de")
+    assert d.batches == [["Guten Tag, ich brauche ein Angebot"]]
+
+def test_unsure_users_are_left_alone_after_max_tries():
+    d = _detector({}, max_tries=2)
+
+    async def scenario():
+        return [await d.for_user(1, f"some unclear message number {i}") for i in range(4)]
+
+    assert asyncio.run(scenario()) == [None] * 4
+    assert len(d.batches) == 2
+    assert d._users[1] == (2, None)
+
+def test_short_texts_do_not_use_up_a_try():
+    d = _detector({"Dzień dobry, proszę o wycenę": "pl"}, min_chars=12, max_tries=1)
+
+    async def scenario():
+        short = await d.for_user(1, "ok 👍 123 456 789")
+        return short, await d.for_user(1, "Dzień dobry, proszę o wycenę")
+
+    assert asyncio.run(scenario()) == (None, "pl")
+    assert d.batches == [["Dzień dobry, proszę o wycenę"]]
+
+def test_concurrent_texts_are_detected_in_one_batch():
+    d = _detector({"a": "en", "b": "de"})
+
+    async def scenario():
+        return await asyncio.gather(d.detect("a"), d.detect("b"), d.detect("c"))
+
+    assert asyncio.run(scenario()) == ["en", "de", None]
+    assert d.batches == [["a", "b", "c"]]
+
+def test_cached_users_are_bounded():
+    d = _detector({f"message from user {i}": "en" for i in range(5)}, cache_size=3)
+
+    async def scenario():
+        for i in range(5):
+            await d.for_user(i, f"message from user {i}")
+
+    asyncio.run(scenario())
+    assert list(d._users) == [2, 3, 4]
+
+def test_disabled_detector_never_detects():
+    d = _detector({"Hello, I would like a quote please": "en"}, max_tries=0)
+    assert asyncio.run(d.for_user(1, "Hello, I would like a quote please")) is None
+    assert d.batches == []
+
+def test_langdetect_profiles_give_stable_answers():
+    pytest.importorskip("langdetect")
+    d = LanguageDetector(["en", "de", "pl"], min_prob=0.5)
+    texts = ["Guten Tag, ich möchte eine Photovoltaikanlage auf meinem Dach installieren",
+             "Hello, I would like to install solar panels on the roof of my house",
+             "Dzień dobry, chciałbym zamontować panele fotowoltaiczne na dachu", "🙂 123"]
+    assert d.detect_many(texts) == ["de", "en", "pl", None]
+    assert d.detect_many(texts) == d.detect_many(list(reversed(texts)))[::-1]
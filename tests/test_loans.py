@@ -0,0 +1,58 @@
+# tests/test_loans.py
+import pytest
+from utils.loans import Offer, MAX_OFFERS, compare, parse_offers, schedule
+from utils.common import loan_calc
+
+def test_annuity_matches_the_closed_form():
+    assert schedule(8000, 5, 10).summary() == (169.98, 10198.58, 2198.58)
+    assert loan_calc(8000, 5, 10) == (169.98, 10198.58, 2198.58)
+
+def test_zero_rate_splits_the_amount_evenly():
+    res = schedule(1200, 1, 0)
+    assert res.summary() == (100.0, 1200.0, 0.0)
+    assert res.interest.sum() == 0
+
+def test_balloon_is_paid_with_the_last_instalment():
+    res = schedule(8000, 5, 0, balloon=2000)
+    assert res.summary() == (100.0, 8000.0, 0.0)
+    assert res.principal[0, -1] == pytest.approx(2100)
+    assert res.balance[0, -1] == 0
+
+def test_schedule_sums_up():
+    res = schedule(10000, 3, 7.5, balloon=1000)
+    assert res.principal.sum() == pytest.approx(10000)
+    assert res.interest.sum() + res.principal.sum() == pytest.approx(res.total[0])
+
+def test_batch_pads_shorter_offers_and_picks_the_cheapest():
+    res = compare([Offer.of(8000, 5, 10), Offer.of(8000, 2, 8)])
+    assert res.interest.shape == (2, 60)
+    assert res.interest[1, 24:].sum() == 0
+    assert res.best() == 1
+
+def test_cached_results_are_read_only():
+    with pytest.raises(ValueError):
+        schedule(8000, 5, 10).payment[0] = 1
+
+@pytest.mark.parametrize("text, offers", [
+    ("8000 5 10", [Offer.of(8000, 5, 10)]),
+    ("8 000 € 60 мес 9,5%", [Offer.of(8000, 5, 9.5)]),
+    ("8k 5 10 2000", [Offer.of(8000, 5, 10, 2000)]),
+    ("8000 5 10; 9000 4 8\n7000 36m 0", [Offer.of(8000, 5, 10), Offer.of(9000, 4, 8), Offer.of(7000, 3, 0)]),
+])
+def test_parse_offers(text, offers):
+    assert parse_offers(text) == offers
+
+@pytest.mark.parametrize("text", [
+    "", "hello", "8000 5", "8000 5 10 1 2",
+    "8000 100000 5",                 # term over MAX_MONTHS
+    "8000 601m 5",
+    "8000 5 101",                    # rate over MAX_RATE_PCT
+    "8000 5 10 9000",                # balloon over the amount
+    "8000 " + "9" * 400 + " 8",      # inf, not OverflowError
+    "9" * 400 + " 5 8",
+    "1" + "0" * 300 + " 50 100",     # computes to inf
+    "\n".join(["8000 5 10"] * (MAX_OFFERS + 1)),
+])
+def test_parse_offers_rejects(text):
+    with pytest.raises(ValueError):
+        compare(parse_offers(text))
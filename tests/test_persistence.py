@@ -0,0 +1,69 @@
+# tests/test_persistence.py
+import asyncio
+from utils.persistence import SQLitePersistence
+
+def _reopen(p: SQLitePersistence, **kw) -> SQLitePersistence:
+    return SQLitePersistence(p.path, update_interval=60, **kw)
+
+def test_user_data_and_conversations_survive_a_restart(tmp_path):
+    async def scenario():
+        p = SQLitePersistence(str(tmp_path / "bot.db"), update_interval=60)
+        await p.update_user_data(1, {"lang": "pl", "phone": "+48 600 000 000"})
+        await p.update_user_data(2, {"lang": "de"})
+        await p.update_conversation("form", (1, 1), 3)
+        await p.update_conversation("credit", (2, 2), 0)
+        await p.flush()
+
+        q = _reopen(p)
+        assert await q.get_user_data() == {}  # nothing is loaded up front
+        ud = {"lang": "ru"}  # set in memory before the row was read
+        await q.refresh_user_data(1, ud)
+        assert ud == {"lang": "ru", "phone": "+48 600 000 000"}
+        assert await q.get_conversations("form") == {(1, 1): 3}
+        assert await q.get_conversations("credit") == {(2, 2): 0}
+
+        await q.drop_user_data(2)
+        await q.update_conversation("form", (1, 1), None)  # conversation ended
+        await q.flush()
+
+        r = _reopen(p)
+        ud = {}
+        await r.refresh_user_data(2, ud)
+        assert ud == {}
+        assert await r.get_conversations("form") == {}
+        await r.flush()
+
+    asyncio.run(scenario())
+
+def test_unchanged_user_data_is_not_written_again(tmp_path):
+    async def scenario():
+        p = SQLitePersistence(str(tmp_path / "bot.db"), update_interval=60)
+        writes = []
+        write_rows = p._write_rows
+        p._write_rows = lambda users, convs: (writes.append(dict(users)), write_rows(users, convs))[1]
+        await p.update_user_data(1, {"lang": "en"})
+        await p.update_user_data(2, {"lang": "es"})  # same run: one transaction
+        await asyncio.sleep(0.05)
+        await p.update_user_data(1, {"lang": "en"})
+        await asyncio.sleep(0.05)
+        await p.update_user_data(1, {"lang": "uk"})
+        await p.flush()
+        return writes
+
+    assert asyncio.run(scenario()) == [{1: '{"lang": "en"}', 2: '{"lang": "es"}'}, {1: '{"lang": "uk"}'}]
+
+def test_known_users_are_bounded_and_evicted_users_reload(tmp_path):
+    async def scenario():
+        p = SQLitePersistence(str(tmp_path / "bot.db"), update_interval=60, max_users=2)
+        for uid in (1, 2, 3):
+            await p.update_user_data(uid, {"n": uid})
+        await p.flush()
+        assert list(p._seen) == [2, 3]
+
+        ud = {}
+        await p.refresh_user_data(1, ud)  # evicted: read from the row again
+        assert ud == {"n": 1}
+        assert list(p._seen) == [3, 1]
+        await p.flush()
+
+    asyncio.run(scenario())
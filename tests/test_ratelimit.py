@@ -0,0 +1,78 @@
+# tests/test_ratelimit.py
+import asyncio
+from telegram.error import RetryAfter
+from utils.ratelimit import BucketStore, FloodGuard, OutboundLimiter, PRIORITY_ADMIN
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    store = BucketStore(rate=2, burst=3)
+    assert [store.allow("u", now=0) for _ in range(4)] == [True, True, True, False]
+    assert not store.allow("u", now=0.4)
+    assert store.allow("u", now=0.5)  # one token back after 1/rate seconds
+
+def test_idle_buckets_are_evicted_once_full_again():
+    store = BucketStore(rate=1, burst=2)
+    store.allow("a", now=0)
+    store.allow("b", now=1)
+    assert len(store) == 2
+    store.allow("c", now=2.5)  # "a" refilled (ttl 2s), "b" has not
+    assert list(store._buckets) == ["b", "c"]
+
+def test_max_keys_drops_the_least_recently_used_bucket():
+    store = BucketStore(rate=0.001, burst=1, max_keys=2)
+    store.allow("a", now=0)
+    store.allow("b", now=0)
+    store.allow("a", now=0)  # touch "a": "b" is now the cold end
+    store.allow("c", now=0)
+    assert list(store._buckets) == ["a", "c"]
+
+def test_reserve_queues_callers_behind_each_other():
+    store = BucketStore(rate=10, burst=1)
+    assert store.reserve("c", now=0) == 0
+    assert store.reserve("c", now=0) == 0.1
+    assert abs(store.reserve("c", now=0) - 0.2) < 1e-9
+    store.allow("other", now=0.15)
+    assert "c" in store._buckets  # a bucket in debt is not evicted
+
+def test_flood_guard_limits_users_and_group_chats_separately():
+    guard = FloodGuard(user_rate=0.001, user_burst=2, chat_rate=0.001, chat_burst=3, max_keys=100)
+    assert guard.check(1, 1) and guard.check(1, 1)
+    assert not guard.check(1, 1)
+    assert guard.check(2, -100) and guard.check(3, -100) and guard.check(4, -100)
+    assert not guard.check(5, -100)  # the group is out of tokens, the user is not
+    assert guard.check(None, None)
+
+def test_admin_calls_wait_for_user_replies():
+    async def scenario():
+        limiter = OutboundLimiter(global_rate=50, chat_rate=0, chat_burst=1, group_rate=0, group_burst=1)
+        await limiter.initialize()
+        order = []
+
+        async def send(name, chat_id, priority):
+            async def callback():
+                order.append(name)
+            await limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": chat_id}, priority)
+
+        try:
+            await asyncio.gather(send("admin1", 1, PRIORITY_ADMIN), send("admin2", 1, PRIORITY_ADMIN),
+                                 send("user1", 2, None), send("user2", 3, None))
+        finally:
+            await limiter.shutdown()
+        return order
+
+    # admin1 takes the only token at hand; everything queued behind it goes out by priority
+    assert asyncio.run(scenario()) == ["admin1", "user1", "user2", "admin2"]
+
+def test_retry_after_pauses_and_retries_the_call():
+    async def scenario():
+        limiter = OutboundLimiter(global_rate=0, chat_rate=0, chat_burst=1, group_rate=0, group_burst=1, max_retries=2)
+        calls = []
+
+        async def callback():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RetryAfter(0)
+            return "ok"
+
+        return await limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 1}, None), len(calls)
+
+    assert asyncio.run(scenario()) == ("ok", 2)
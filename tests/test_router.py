@@ -0,0 +1,44 @@
+# tests/test_router.py
+from datetime import datetime, timezone
+import pytest
+from telegram import Chat, Message
+from utils.router import IntentFilter, IntentRouter, MENU_INTENTS
+from utils.texts import TEXTS
+
+@pytest.mark.parametrize("key", sorted(MENU_INTENTS))
+def test_every_localized_menu_label_routes_to_its_intent(key):
+    r = IntentRouter()
+    for lang, label in TEXTS[key].items():
+        assert r.route(label) == MENU_INTENTS[key], (key, lang)
+
+def test_labels_match_without_emoji_case_or_padding():
+    r = IntentRouter()
+    assert r.route("  solar CALCULATOR ") == "solar"
+    assert r.route("Kalkulator PV!") == "solar"
+    assert r.route("💳 кредитный калькулятор") == "credit"
+
+def test_aliases_only_match_the_whole_message():
+    r = IntentRouter()
+    assert r.route("PV") == "solar"
+    assert r.route("кредит") == "credit"
+    assert r.route("хочу PV на дом") is None
+    assert r.route("нужен кредит на панели") is None
+
+def test_keywords_match_at_a_word_start_anywhere():
+    r = IntentRouter()
+    assert r.route("Какая цена за 5 кВт?") == "price"
+    assert r.route("дайте ваш телефон") == "contact"
+    assert r.route("от чего зависит стоимостью монтажа") == "price"
+    assert r.route("какая себестоимость?") is None  # not at a word start
+
+def test_empty_text_has_no_intent():
+    r = IntentRouter()
+    assert r.route(None) is None
+    assert r.route("") is None
+
+def test_intent_filter_passes_only_its_intent():
+    msg = Message(1, datetime.now(timezone.utc), Chat(1, Chat.PRIVATE), text="🔆 PV-Rechner")
+    assert IntentFilter("solar").filter(msg)
+    assert not IntentFilter("credit").filter(msg)
+    free = Message(2, datetime.now(timezone.utc), Chat(1, Chat.PRIVATE), text="хочу PV на дом")
+    assert not IntentFilter("solar").filter(free)
@@ -0,0 +1,162 @@
+# tests/test_sheets.py
+import asyncio, time
+from bench.stubs import StubSpreadsheet, StubWorksheet
+from utils.dedup import LeadIndex
+from utils.journal import LeadJournal
+from utils.sheets import HEADER, SheetClient, NEW, UPDATED, DUPLICATE
+
+LEAD = dict(username="ann", chat_id=1, lang="pl", name="Ann", phone="+48512345678", city="Kraków")
+
+class SlowSheetClient(SheetClient):
+    """Connects to a stub spreadsheet after ``connect_delay``, like the first flush after a start;
+    the first ``failed_connects`` attempts fail, like an outage."""
+
+    def __init__(self, sh: StubSpreadsheet, journal: LeadJournal, connect_delay: float = 0.0,
+                 failed_connects: int = 0, **kw):
+        super().__init__(batch_size=10, flush_interval=0.01, journal=journal, index=LeadIndex(3600), **kw)
+        self.stub, self.connect_delay, self.failed_connects = sh, connect_delay, failed_connects
+
+    def init(self):
+        time.sleep(self.connect_delay)
+        if self.failed_connects:
+            self.failed_connects -= 1
+            return False
+        self.load_shards(self.stub)
+        return True
+
+def _client(tmp_path, connect_delay=0.0, failed_connects=0, **kw) -> SlowSheetClient:
+    return SlowSheetClient(StubSpreadsheet(latency=0), LeadJournal(str(tmp_path / "leads.sqlite3"), commit_delay=0),
+                           connect_delay, failed_connects, **kw)
+
+def _notes(client: SlowSheetClient):
+    return [row[-1] for row in client.stub.rows]
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_new_lead_is_appended(tmp_path):
+    async def scenario():
+        client = _client(tmp_path)
+        await client.start()
+        assert await client.submit_lead(note="first", **LEAD) == NEW
+        await client.close()
+        return client
+    client = run(scenario())
+    assert _notes(client) == ["first"]
+    assert client.stub.tabs[0].rows[0][0] == "TimestampUTC"
+
+def test_identical_resubmission_is_a_duplicate(tmp_path):
+    async def scenario():
+        client = _client(tmp_path)
+        await client.start()
+        await client.submit_lead(note="first", **LEAD)
+        status = await client.submit_lead(note="first", **LEAD)
+        await client.close()
+        return client, status
+    client, status = run(scenario())
+    assert status == DUPLICATE
+    assert _notes(client) == ["first"]
+
+def test_change_is_merged_into_unsent_lead(tmp_path):
+    async def scenario():
+        client = _client(tmp_path)
+        await client.journal.open()  # no writer started: the lead stays unsent
+        await client.submit_lead(note="first", **LEAD)
+        status = await client.submit_lead(note="CHANGED", **LEAD)
+        pending = await client.journal.pending(10)
+        await client.journal.close()
+        return status, pending
+    status, pending = run(scenario())
+    assert status == UPDATED
+    assert [row[-1] for _, row, _ in pending] == ["CHANGED"]
+
+def test_change_of_shipped_lead_overwrites_its_row(tmp_path):
+    async def scenario():
+        client = _client(tmp_path)
+        await client.start()
+        await client.submit_lead(note="first", **LEAD)
+        while client._backlog:
+            await asyncio.sleep(0.01)
+        status = await client.submit_lead(note="CHANGED", **LEAD)
+        await client.close()
+        return client, status
+    client, status = run(scenario())
+    assert status == UPDATED
+    assert _notes(client) == ["CHANGED"]
+
+def test_change_during_slow_first_flush_is_not_lost(tmp_path):
+    """The writer selects the lead, then connects for a while; a merge in between would be acked unseen."""
+    async def scenario():
+        client = _client(tmp_path, connect_delay=0.3)
+        await client.start()
+        await client.submit_lead(note="first", **LEAD)
+        await asyncio.sleep(0.1)  # the writer is connecting with the lead selected
+        assert client._flushing
+        status = await client.submit_lead(note="CHANGED", **LEAD)
+        await client.close()
+        return client, status
+    client, status = run(scenario())
+    assert status == UPDATED
+    assert _notes(client) == ["CHANGED"]
+
+def test_change_during_failed_first_flush_updates_the_row(tmp_path):
+    """The flush holding the original fails; the retry must not append the change as a second row."""
+    async def scenario():
+        client = _client(tmp_path, connect_delay=0.2, failed_connects=1)
+        await client.start()
+        await client.submit_lead(note="first", **LEAD)
+        await asyncio.sleep(0.1)
+        assert client._flushing
+        status = await client.submit_lead(note="CHANGED", **LEAD)
+        while client._backlog:  # the retry after the backoff ships both
+            await asyncio.sleep(0.05)
+        await client.close()
+        return client, status
+    client, status = run(scenario())
+    assert status == UPDATED
+    assert _notes(client) == ["CHANGED"]
+
+def test_unsent_leads_are_replayed_after_restart(tmp_path):
+    async def scenario():
+        client = _client(tmp_path)
+        await client.journal.open()  # no writer started: the lead stays unsent
+        await client.submit_lead(note="first", **LEAD)
+        await client.journal.close()
+        client = _client(tmp_path)
+        await client.start()
+        await client.close()
+        return client
+    assert _notes(run(scenario())) == ["first"]
+
+def test_change_of_lead_in_deleted_worksheet_is_appended(tmp_path):
+    """``export.py archive --delete`` removed the worksheet the bot still has a handle of."""
+    async def scenario():
+        client = _client(tmp_path)
+        await client.start()
+        await client.submit_lead(note="first", **LEAD)
+        while client._backlog:
+            await asyncio.sleep(0.01)
+        [ws] = client.stub.tabs
+        client.stub.del_worksheet(ws)
+        status = await client.submit_lead(note="CHANGED", **LEAD)
+        await asyncio.wait_for(client.close(), 5)
+        return client, status
+    client, status = run(scenario())
+    assert status == UPDATED
+    assert _notes(client) == ["CHANGED"]
+    assert not client._backlog
+
+def test_legacy_worksheet_is_counted_by_rows_in_use(tmp_path):
+    """The old "Leads" worksheet has a 2000-row grid but 10 leads: it is not full at max_rows=50."""
+    async def scenario():
+        client = _client(tmp_path, rotation="none", max_rows=50)
+        legacy = StubWorksheet(0, "Leads", 1)
+        legacy.rows = [list(HEADER)] + [["1700000000"] + [""] * 8 for _ in range(10)] + [[""] * 9] * 1989
+        client.stub.tabs.append(legacy)
+        await client.start()
+        await client.submit_lead(note="first", **LEAD)
+        await client.close()
+        return client, legacy
+    client, legacy = run(scenario())
+    assert [ws.title for ws in client.stub.tabs] == ["Leads"]  # no "Leads #2"
+    assert legacy.rows[-1][-1] == "first"
@@ -0,0 +1,37 @@
+# tests/test_solar.py
+import numpy as np
+import pytest
+import config
+from utils.solar import REGIONS, estimate, sweep
+
+def _simple(consumption, tariff, psh):
+    """The bot's original one-line estimate."""
+    kw = consumption / (psh * 30 * config.SOLAR_PERFORMANCE)
+    cost = kw * config.SOLAR_COST_PER_KW
+    gen = kw * psh * 365 * config.SOLAR_PERFORMANCE
+    return {"kw": kw, "cost": cost, "gen": gen, "save": gen * tariff, "payback": cost / (gen * tariff)}
+
+@pytest.mark.parametrize("consumption, tariff, psh", [(300, 0.25, 4.5), (417, 0.31, 4.22), (1234.5, 0.1234, 3.33)])
+def test_estimate_uses_the_exact_inputs(consumption, tariff, psh):
+    r = estimate(consumption, tariff, psh)
+    for key, value in _simple(consumption, tariff, psh).items():
+        assert r[key] == pytest.approx(value, rel=1e-12)
+
+@pytest.mark.parametrize("args", [(0, 0.25), (300, 0), (300, 0.25, -1), (float("nan"), 0.25)])
+def test_estimate_rejects_bad_values(args):
+    with pytest.raises(ValueError):
+        estimate(*args)
+
+def test_config_region_is_a_known_profile():
+    assert config.SOLAR_REGION in REGIONS
+    assert set(config.SOLAR_REGIONS) == set(REGIONS)
+
+def test_sweep_shapes_and_cache():
+    res = sweep(300, 0.25, 4.5)
+    r, s, e, d, y = len(REGIONS), 11, 4, 3, config.SOLAR_HORIZON_YEARS
+    assert res.savings.shape == (r, s, e, d, y)
+    assert res.payback.shape == (r, s, e, d)
+    assert not res.savings.flags.writeable
+    assert sweep(300.2, 0.2502, 4.49) is res  # quantized to the same cache key
+    # the yearly total of every profile matches kW * PSH * 365 * performance
+    assert np.allclose(res.generation[:, :, 0, 0], res.sizes * 4.5 * 365 * config.SOLAR_PERFORMANCE)
@@ -0,0 +1,50 @@
+# tests/test_updates.py
+import asyncio, random
+from datetime import datetime, timezone
+from telegram import Chat, Message, Update
+from utils.updates import ChatOrderedUpdateProcessor
+
+def _update(update_id: int, chat_id: int) -> Update:
+    return Update(update_id, message=Message(update_id, datetime.now(timezone.utc), Chat(chat_id, Chat.PRIVATE), text="x"))
+
+async def _replay(processor: ChatOrderedUpdateProcessor, updates, handler):
+    await asyncio.gather(*(processor.process_update(u, handler(u)) for u in updates))
+
+def test_each_chat_keeps_arrival_order_while_chats_run_concurrently():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(4)
+        rnd = random.Random(0)
+        updates = [_update(i, chat_id=i % 6) for i in range(240)]
+        seen, running, peak = {}, set(), [0]
+
+        async def handler(u: Update):
+            chat = u.effective_chat.id
+            assert chat not in running  # one update per chat at a time
+            running.add(chat)
+            peak[0] = max(peak[0], len(running))
+            await asyncio.sleep(rnd.uniform(0, 0.002))
+            seen.setdefault(chat, []).append(u.update_id)
+            running.discard(chat)
+
+        await _replay(processor, updates, handler)
+        return processor, updates, seen, peak[0]
+
+    processor, updates, seen, peak = asyncio.run(scenario())
+    for chat, ids in seen.items():
+        assert ids == [u.update_id for u in updates if u.effective_chat.id == chat]
+    assert 1 < peak <= 4
+    assert not processor._chats  # locks are dropped once their chat is idle
+
+def test_updates_without_a_chat_only_take_a_slot():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(2)
+        done = []
+
+        async def handler(i):
+            await asyncio.sleep(0)
+            done.append(i)
+
+        await asyncio.gather(*(processor.process_update(object(), handler(i)) for i in range(5)))
+        return done
+
+    assert sorted(asyncio.run(scenario())) == list(range(5))
@@ -0,0 +1,34 @@
+# tests/test_validators.py
+import asyncio
+import pytest
+from utils.validators import normalize_phone, normalize_phone_async, revalidate_phones
+
+@pytest.mark.parametrize("raw, e164", [
+    ("+48512345678", "+48512345678"),
+    ("512 345 678", "+48512345678"),           # DEFAULT_REGION
+    ("0048 512-345-678", "+48512345678"),
+    ("(+48) 512 345 678", "+48512345678"),
+    ("tel: +48512345678", "+48512345678"),
+    ("мой номер +48512345678", "+48512345678"),
+    ("+48512345678 ext 1", "+48512345678"),
+    ("+48512345678 доб. 3", "+48512345678"),
+    ("+48512345678;ext=1", "+48512345678"),
+    ("＋48512345678", "+48512345678"),          # full-width
+    ("+49 151/12345678", "+4915112345678"),
+    ("+48/512345678", "+48512345678"),
+    ("+48 512–345–678", "+48512345678"),        # en dash
+    ("+48 512−345−678", "+48512345678"),        # minus sign
+    ("+380 67 123 4567", "+380671234567"),
+])
+def test_normalize_phone(raw, e164):
+    assert normalize_phone(raw) == e164
+    assert asyncio.run(normalize_phone_async(raw)) == e164
+
+@pytest.mark.parametrize("raw", ["", "abc", "12", "+48 123", "+1-800-FLOWERS", "9" * 30])
+def test_normalize_phone_rejects(raw):
+    assert normalize_phone(raw) is None
+    assert asyncio.run(normalize_phone_async(raw)) is None
+
+def test_revalidate_phones_lists_only_non_e164():
+    stored = ["+48512345678", "512 345 678", "12", "+48512345678"]
+    assert revalidate_phones(stored) == [(1, "512 345 678", "+48512345678"), (2, "12", None)]
@@ -0,0 +1,124 @@
+# utils/alerts.py
+import asyncio, logging
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+from utils.metrics import ADMIN_ALERTS
+from utils.ratelimit import PRIORITY_ADMIN
+import config
+
+log = logging.getLogger("alerts")
+
+MAX_MESSAGE = 4096  # Telegram text limit
+SEPARATOR = "\n\n"
+
+def digest(alerts: List[str], limit: int = MAX_MESSAGE) -> List[Tuple[int, str]]:
+    """Pack alerts into as few messages as fit under ``limit``: [(alerts in it, text)].
+    A message holding a single alert is sent as is."""
+    out, cur, count = [], "", 0
+    for a in alerts:
+        a = a[:limit - 64]  # room for the digest header
+        if cur and len(cur) + len(SEPARATOR) + len(a) > limit - 64:
+            out.append((count, cur))
+            cur, count = "", 0
+        cur = cur + SEPARATOR + a if cur else a
+        count += 1
+    if count:
+        out.append((count, cur))
+    return [(n, f"📥 {n} leads:{SEPARATOR}{text}" if n > 1 else text) for n, text in out]
+
+class AdminNotifier:
+    """Admin lead alerts sent by a background task at low priority.
+
+    ``notify`` only queues the text. While a send is waiting behind user replies
+    (or Telegram asked us to slow down), new alerts pile up and go out together
+    as one digest message. Sends that failed for a transient reason are kept and
+    retried with backoff; ones Telegram refuses for good (the bot was removed from
+    the chat, the chat does not exist) are logged and dropped. At most ``max_queue``
+    alerts are kept, the oldest go first.
+    """
+
+    def __init__(self, chat_id: int, max_backoff: float = 60.0, max_queue: int = 1000):
+        self.chat_id = chat_id
+        self.max_backoff = max_backoff
+        self.max_queue = max(1, max_queue)
+        self.bot = None
+        self._queue: Deque[str] = deque(maxlen=self.max_queue)
+        self._has_alerts = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self, text: str):
+        if not self.chat_id:
+            return
+        if len(self._queue) == self.max_queue:
+            ADMIN_ALERTS.inc("dropped")
+            log.warning("Admin alert queue full (%d), dropping the oldest: %s", self.max_queue, self._queue[0])
+        self._queue.append(text)
+        ADMIN_ALERTS.inc("queued")
+        self._has_alerts.set()
+
+    async def start(self, bot):
+        self.bot = bot
+        if self.chat_id and not self._task:
+            self._task = asyncio.create_task(self._run(), name="admin-alerts")
+
+    async def close(self, timeout: float = 5.0):
+        """Stop the sender and try once more to deliver what is queued."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._queue and self.bot:
+            try:
+                await asyncio.wait_for(self._send_pending(), timeout)
+            except Exception as e:
+                log.error("Admin alerts not delivered on shutdown (%d): %s", len(self._queue), e)
+
+    async def _send_pending(self):
+        from telegram.error import BadRequest, ChatMigrated, Forbidden
+        # low priority only means something (and is only accepted) when the bot has a rate limiter
+        kw = {"rate_limit_args": PRIORITY_ADMIN} if getattr(self.bot, "rate_limiter", None) else {}
+        batch = list(self._queue)
+        self._queue.clear()
+        done = 0
+        try:
+            for n, text in digest(batch):
+                try:
+                    await self.bot.send_message(self.chat_id, text, **kw)
+                except ChatMigrated as e:  # the group became a supergroup: same chat, new id
+                    log.warning("Admin chat %s migrated to %s, set ADMIN_CHAT_ID to it", self.chat_id, e.new_chat_id)
+                    self.chat_id = e.new_chat_id
+                    raise
+                except (Forbidden, BadRequest) as e:
+                    ADMIN_ALERTS.inc("dropped", amount=n)
+                    log.error("Admin alert refused by Telegram, dropped (%d alerts): %s\n%s", n, e, text)
+                else:
+                    ADMIN_ALERTS.inc("sent")
+                    if n > 1:
+                        ADMIN_ALERTS.inc("digest")
+                done += n
+        finally:
+            if done < len(batch):
+                # back in front of what arrived meanwhile; over max_queue the oldest go
+                keep = batch[done:] + list(self._queue)
+                if len(keep) > self.max_queue:
+                    ADMIN_ALERTS.inc("dropped", amount=len(keep) - self.max_queue)
+                self._queue = deque(keep, maxlen=self.max_queue)
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            if not self._queue:
+                self._has_alerts.clear()
+                await self._has_alerts.wait()
+            try:
+                await self._send_pending()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ADMIN_ALERTS.inc("failed")
+                log.error("Admin notify error (%d queued, retry in %.0fs): %s", len(self._queue), backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+admin_alerts = AdminNotifier(config.ADMIN_CHAT_ID, max_queue=config.ADMIN_ALERTS_MAX_QUEUE)
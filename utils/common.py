@@ -1,18 +1,12 @@
 # utils/common.py
-import time
-from typing import Tuple, Dict
+import string
+from functools import lru_cache
+from typing import Dict, List, Tuple
 from telegram import ReplyKeyboardMarkup, KeyboardButton
 from .texts import TEXTS
+import config
 
-_last_msgs: Dict[int, float] = {}
-
-def anti_flood_ok(user_id: int, window_sec: int) -> bool:
-    now = time.time()
-    last = _last_msgs.get(user_id, 0)
-    if now - last >= window_sec:
-        _last_msgs[user_id] = now
-        return True
-    return False
+FALLBACK_LANG = "ru"
 
 def pick_lang(lang_code: str) -> str:
     if not lang_code:
@@ -23,9 +17,33 @@ def pick_lang(lang_code: str) -> str:
             return k
     return "ru"
 
+def compile_texts(texts: Dict[str, Dict[str, str]], langs: List[str], fallback: str = FALLBACK_LANG) -> Dict[str, Dict[str, str]]:
+    """Flatten TEXTS into one {key: text} table per language with the fallback already applied."""
+    return {lang: {key: tr.get(lang, tr.get(fallback, "")) for key, tr in texts.items()} for lang in langs}
+
+def _placeholders(template: str) -> set:
+    return {name for _, name, _, _ in string.Formatter().parse(template) if name}
+
+def check_texts(texts: Dict[str, Dict[str, str]], langs: List[str], fallback: str = FALLBACK_LANG) -> List[str]:
+    """Missing translations and translations whose {placeholders} differ from the fallback."""
+    problems = []
+    for key, tr in texts.items():
+        ref = _placeholders(tr.get(fallback, ""))
+        for lang in langs:
+            if lang not in tr:
+                problems.append(f"{key}: missing '{lang}'")
+            elif _placeholders(tr[lang]) != ref:
+                problems.append(f"{key}: '{lang}' placeholders {sorted(_placeholders(tr[lang]))} != {sorted(ref)}")
+    return problems
+
+_TABLES = compile_texts(TEXTS, config.SUPPORTED_LANGS)
+_FALLBACK_TABLE = _TABLES[FALLBACK_LANG]
+
 def t(key: str, lang: str) -> str:
-    return TEXTS.get(key, {}).get(lang, TEXTS.get(key, {}).get("ru", ""))
+    return _TABLES.get(lang, _FALLBACK_TABLE).get(key, "")
 
+# keyboards are immutable in PTB 20, so one instance per language is shared by all chats
+@lru_cache(maxsize=16)
 def main_menu(lang: str):
     kb = [
         [KeyboardButton(t("menu_about", lang)), KeyboardButton(t("menu_services", lang))],
@@ -36,12 +54,7 @@ def main_menu(lang: str):
     ]
     return ReplyKeyboardMarkup(kb, resize_keyboard=True)
 
-def loan_calc(amount: float, years: float, rate_pct: float) -> Tuple[float, float, float]:
-    n = int(years * 12)
-    r = (rate_pct / 100) / 12
-    if n <= 0 or amount <= 0 or rate_pct <= 0:
-        raise ValueError("bad values")
-    m = amount * r * (1 + r) ** n / ((1 + r) ** n - 1)
-    total = m * n
-    over = total - amount
-    return (round(m, 2), round(total, 2), round(over, 2))
+def loan_calc(amount: float, years: float, rate_pct: float, balloon: float = 0.0) -> Tuple[float, float, float]:
+    """(monthly, total, overpayment); a shortcut for ``utils.loans.schedule(...).summary()``."""
+    from utils.loans import schedule
+    return schedule(amount, years, rate_pct, balloon).summary()
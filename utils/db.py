@@ -0,0 +1,20 @@
+# utils/db.py
+import os, sqlite3
+
+def open_db(path: str, synchronous: str = "NORMAL") -> sqlite3.Connection:
+    """SQLite connection tuned for a small append-heavy local store.
+
+    WAL lets readers (exports, reports) run while the bot writes.
+    synchronous=NORMAL fsyncs only on checkpoint: the database survives a
+    crash, but commits since the last checkpoint can be lost on power
+    failure. FULL fsyncs the WAL on every commit, for data that must not be
+    lost once a commit returns.
+    """
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
@@ -0,0 +1,73 @@
+# utils/dedup.py
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional, Tuple
+import config
+
+class LeadRef:
+    """Where an earlier lead lives: its journal id and/or its (worksheet, row), plus what was submitted."""
+    __slots__ = ("ts", "lead_id", "sheet_pos", "fields")
+
+    def __init__(self, ts: float, lead_id: Optional[int], sheet_pos: Optional[Tuple[Optional[str], int]],
+                 fields: Tuple[str, ...] = ()):
+        self.ts, self.lead_id, self.sheet_pos, self.fields = ts, lead_id, sheet_pos, fields
+
+class LeadIndex:
+    """Recent leads keyed by E.164 phone and by Telegram user id.
+
+    Both keys of a lead point at the same :class:`LeadRef`. Entries expire
+    ``window`` seconds after the lead's last submission; expired ones are
+    evicted from the cold end of an LRU ``OrderedDict`` (as in
+    :class:`utils.ratelimit.BucketStore`) and ``max_keys`` bounds the size.
+    """
+
+    def __init__(self, window: float, max_keys: int = 100000):
+        self.window = window
+        self.max_keys = max_keys
+        self._refs: "OrderedDict[Hashable, LeadRef]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._refs)
+
+    @staticmethod
+    def _keys(phone: str, chat_id) -> Iterable[Hashable]:
+        if phone:
+            yield ("phone", phone)
+        if chat_id not in (None, ""):
+            yield ("user", str(chat_id))
+
+    def find(self, phone: str, chat_id, now: Optional[float] = None) -> Optional[LeadRef]:
+        """The most recent lead within the window with the same phone or the same user."""
+        if self.window <= 0:
+            return None
+        now = time.time() if now is None else now
+        self._evict(now)
+        hits = [r for r in (self._refs.get(k) for k in self._keys(phone, chat_id)) if r and now - r.ts < self.window]
+        return max(hits, key=lambda r: r.ts) if hits else None
+
+    def add(self, phone: str, chat_id, ref: LeadRef):
+        if self.window <= 0:
+            return
+        for key in self._keys(phone, chat_id):
+            old = self._refs.get(key)
+            if old is not None and old.ts > ref.ts:
+                continue  # warm-up can load older leads after newer ones
+            self._refs[key] = ref
+            self._refs.move_to_end(key)
+        while len(self._refs) > self.max_keys:
+            self._refs.popitem(last=False)
+
+    def touch(self, ref: LeadRef, phone: str, chat_id, ts: float):
+        """A duplicate was merged into ``ref``: restart its window and index its (possibly new) keys."""
+        ref.ts = ts
+        self.add(phone, chat_id, ref)
+
+    def _evict(self, now: float):
+        refs = self._refs
+        while refs:
+            key, r = next(iter(refs.items()))
+            if now - r.ts < self.window:
+                break
+            del refs[key]
+
+lead_index = LeadIndex(config.DEDUP_WINDOW_SEC, config.DEDUP_MAX_KEYS)
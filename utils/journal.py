@@ -0,0 +1,187 @@
+# utils/journal.py
+import asyncio, logging, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from config import LEADS_JOURNAL_PATH, JOURNAL_COMMIT_DELAY_MS
+from .db import open_db
+
+log = logging.getLogger("journal")
+
+# (worksheet title, row); the title is None for rows written before worksheets were rotated
+SheetPos = Tuple[Optional[str], int]
+
+COLUMNS = ["ts", "username", "chat_id", "lang", "type", "name", "phone", "city", "note"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in COLUMNS)},
+    sent_at INTEGER,
+    dup_of INTEGER,    -- this row updates an earlier lead instead of being a new one
+    sheet_row INTEGER, -- row in the sheet: where it was written, or for an update the row to overwrite
+    sheet_title TEXT   -- worksheet of sheet_row; NULL for rows written before worksheets were rotated
+);
+CREATE INDEX IF NOT EXISTS leads_unsent ON leads(id) WHERE sent_at IS NULL;
+CREATE INDEX IF NOT EXISTS leads_updates ON leads(dup_of) WHERE dup_of IS NOT NULL;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+class LeadJournal:
+    """Local lead log; the source of truth for what still has to reach Sheets.
+
+    :meth:`append` returns only after the row is committed. Concurrent appends
+    are group-committed (one transaction per ``JOURNAL_COMMIT_DELAY_MS`` window);
+    with synchronous=FULL every commit fsyncs the WAL, so a burst of leads
+    costs one fsync, not one per lead. Rows are shipped by
+    :class:`utils.sheets.SheetClient` and acknowledged with :meth:`ack`; the
+    ``checkpoint`` in ``meta`` is the highest id below which everything is acked.
+    Delivery is at-least-once: a crash between append_rows and ack re-sends the batch.
+
+    A repeated submission is either merged into its still-unsent original
+    (:meth:`merge`) or journaled with ``dup_of`` set, and then overwrites the
+    original's sheet position (``sheet_title``, ``sheet_row``) instead of being appended.
+    """
+
+    def __init__(self, path: str = LEADS_JOURNAL_PATH, commit_delay: float = JOURNAL_COMMIT_DELAY_MS / 1000):
+        self.path = path
+        self.commit_delay = commit_delay
+        self._conn = None
+        # sqlite3 connections are not thread-safe, so every call goes through one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._commit_task: Optional[asyncio.Task] = None
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self):
+        if self._conn is None:
+            await self._call(self._open)
+
+    def _open(self):
+        self._conn = open_db(self.path, synchronous="FULL")  # a lead is durable once append() returns
+        have = {r[1] for r in self._conn.execute("PRAGMA table_info(leads)")}
+        # journals created before dedup / worksheet rotation
+        for col, kind in (("dup_of", "INTEGER"), ("sheet_row", "INTEGER"), ("sheet_title", "TEXT")):
+            if have and col not in have:
+                self._conn.execute(f"ALTER TABLE leads ADD COLUMN {col} {kind}")
+        self._conn.executescript(SCHEMA)
+
+    async def close(self):
+        while self._commit_task:
+            await self._commit_task
+        if self._conn is not None:
+            await self._call(self._conn.close)
+            self._conn = None
+
+    # ===== append (group commit) =====
+
+    async def append(self, row: List[str], dup_of: Optional[int] = None, sheet_pos: Optional[SheetPos] = None) -> int:
+        fut = asyncio.get_running_loop().create_future()
+        title, sheet_row = sheet_pos or (None, None)
+        self._pending.append(((*row, dup_of, sheet_row, title), fut))
+        if self._commit_task is None:
+            self._commit_task = asyncio.create_task(self._commit_soon())
+        return await fut
+
+    async def _commit_soon(self):
+        await asyncio.sleep(self.commit_delay)
+        batch, self._pending = self._pending, []
+        try:
+            ids = await self._call(self._insert, [row for row, _ in batch])
+        except Exception as e:
+            log.error("Journal write error (%d rows): %s", len(batch), e)
+            for _, fut in batch:
+                fut.set_exception(e)
+        else:
+            for (_, fut), rowid in zip(batch, ids):
+                fut.set_result(rowid)
+        finally:
+            # rows that arrived while this batch was being written go into the next one
+            self._commit_task = asyncio.create_task(self._commit_soon()) if self._pending else None
+
+    def _insert(self, rows: List[tuple]) -> List[int]:
+        cols = COLUMNS + ["dup_of", "sheet_row", "sheet_title"]
+        sql = f"INSERT INTO leads ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        cur = self._conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            ids = []
+            for row in rows:
+                cur.execute(sql, row)
+                ids.append(cur.lastrowid)
+            cur.execute("COMMIT")
+            return ids
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    async def merge(self, lead_id: int, row: List[str]) -> bool:
+        """Overwrite a lead that has not been shipped yet; False if it already was."""
+        return await self._call(self._merge, lead_id, row)
+
+    def _merge(self, lead_id: int, row: List[str]) -> bool:
+        cur = self._conn.execute(f"UPDATE leads SET {', '.join(c + ' = ?' for c in COLUMNS)} "
+                                 "WHERE id = ? AND sent_at IS NULL", (*row, lead_id))
+        return cur.rowcount > 0
+
+    async def recent(self, since: int) -> List[tuple]:
+        """(lead id, ts, chat_id, phone, lang, name, city, note, sheet_title, sheet_row) of rows submitted
+        since ``since``, oldest first; for an update row the lead id is the original's."""
+        return await self._call(lambda: self._conn.execute(
+            "SELECT COALESCE(dup_of, id), CAST(ts AS INTEGER), chat_id, phone, lang, name, city, note, "
+            "sheet_title, sheet_row FROM leads WHERE CAST(ts AS INTEGER) >= ? ORDER BY id", (since,)).fetchall())
+
+    # ===== replay =====
+
+    async def pending(self, limit: int) -> List[Tuple[int, List[str], Optional[SheetPos]]]:
+        """Unsent rows as (id, row, (worksheet, row) to overwrite or None to append).
+        An update is held back until its original has been acked."""
+        return await self._call(self._select_pending, limit)
+
+    def _select_pending(self, limit: int):
+        ckpt = self._checkpoint()
+        cur = self._conn.execute(
+            f"SELECT l.id, {', '.join('l.' + c for c in COLUMNS)}, "
+            # only update rows have dup_of or a sheet_row before they are acked
+            "CASE WHEN l.sheet_row IS NOT NULL THEN l.sheet_title ELSE o.sheet_title END, "
+            "CASE WHEN l.dup_of IS NOT NULL OR l.sheet_row IS NOT NULL THEN COALESCE(l.sheet_row, o.sheet_row) END "
+            "FROM leads l LEFT JOIN leads o ON o.id = l.dup_of "
+            # an update waits until its original is in the sheet: before that it has no row to overwrite
+            "WHERE l.id > ? AND l.sent_at IS NULL AND (o.id IS NULL OR o.sent_at IS NOT NULL) "
+            "ORDER BY l.id LIMIT ?",
+            (ckpt, limit),
+        )
+        return [(r[0], list(r[1:-2]), (r[-2], r[-1]) if r[-1] is not None else None) for r in cur]
+
+    async def count_pending(self) -> int:
+        return await self._call(lambda: self._conn.execute(
+            "SELECT COUNT(*) FROM leads WHERE id > ? AND sent_at IS NULL", (self._checkpoint(),)).fetchone()[0])
+
+    async def ack(self, ids: List[int], sheet_pos: Optional[List[Optional[SheetPos]]] = None):
+        """Mark rows as shipped, recording the (worksheet, row) each one landed in when known."""
+        if ids:
+            await self._call(self._ack, ids, sheet_pos or [None] * len(ids))
+
+    def _ack(self, ids: List[int], sheet_pos: List[Optional[SheetPos]]):
+        now = int(time.time())
+        cur = self._conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            cur.executemany("UPDATE leads SET sent_at = ?, sheet_title = COALESCE(?, sheet_title), "
+                            "sheet_row = COALESCE(?, sheet_row) WHERE id = ?",
+                            [(now, *(pos or (None, None)), i) for i, pos in zip(ids, sheet_pos)])
+            first_unsent = cur.execute("SELECT MIN(id) FROM leads WHERE sent_at IS NULL").fetchone()[0]
+            if first_unsent is None:
+                first_unsent = (cur.execute("SELECT MAX(id) FROM leads").fetchone()[0] or 0) + 1
+            cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('checkpoint', ?)", (str(first_unsent - 1),))
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    def _checkpoint(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'checkpoint'").fetchone()
+        return int(row[0]) if row else 0
+
+journal = LeadJournal()
@@ -0,0 +1,123 @@
+# utils/langid.py
+import asyncio, logging, os, re, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from utils.metrics import LANG_DETECTIONS, LANGDETECT_SECONDS
+import config
+
+log = logging.getLogger("langid")
+
+_LETTERS = re.compile(r"[^\W\d_]")
+
+class LanguageDetector:
+    """Guesses a user's language from their first free-text messages.
+
+    langdetect profiles are loaded once (by :meth:`load`, from the warm-up) into
+    one shared factory that knows only ``langs`` and is seeded, so the same text
+    always gets the same answer. Texts submitted within ``batch_delay`` are
+    detected together in one executor call, off the event loop. Each user gets
+    at most ``max_tries`` detections: the first confident one is cached and
+    reused, and after ``max_tries`` unsure ones the user is left alone.
+    """
+
+    def __init__(self, langs: List[str], min_chars: int = 12, min_prob: float = 0.8, max_tries: int = 3,
+                 cache_size: int = 50000, batch_delay: float = 0.005):
+        self.langs = langs
+        self.min_chars = min_chars
+        self.min_prob = min_prob
+        self.max_tries = max_tries
+        self.cache_size = cache_size
+        self.batch_delay = batch_delay
+        self._factory = None
+        self._load_lock = threading.Lock()
+        self._users: "OrderedDict[int, Tuple[int, Optional[str]]]" = OrderedDict()  # user -> (tries, lang)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="langid")
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._batch_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tries > 0
+
+    def load(self):
+        """Blocking: read the profiles of ``langs`` (~0.5s for all 55, far less for a few)."""
+        with self._load_lock:
+            if self._factory is not None:
+                return
+            from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+            profiles = []
+            for lang in self.langs:
+                with open(os.path.join(PROFILES_DIRECTORY, lang), encoding="utf-8") as f:
+                    profiles.append(f.read())
+            factory = DetectorFactory()
+            factory.load_json_profile(profiles)
+            factory.seed = 0
+            self._factory = factory
+
+    def detect_many(self, texts: List[str]) -> List[Optional[str]]:
+        """Blocking; the most likely language of each text, None when below ``min_prob``."""
+        from langdetect.lang_detect_exception import LangDetectException
+        self.load()
+        out = []
+        for text in texts:
+            d = self._factory.create()
+            d.append(text)
+            try:
+                best = d.get_probabilities()[0]
+            except (LangDetectException, IndexError):  # nothing to go on (emoji, digits)
+                out.append(None)
+                continue
+            out.append(best.lang if best.prob >= self.min_prob else None)
+        return out
+
+    async def detect(self, text: str) -> Optional[str]:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((text, fut))
+        if self._batch_task is None:
+            self._batch_task = asyncio.create_task(self._detect_soon())
+        return await fut
+
+    async def _detect_soon(self):
+        await asyncio.sleep(self.batch_delay)
+        batch, self._pending = self._pending, []
+        t0 = time.perf_counter()
+        try:
+            langs = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.detect_many, [text for text, _ in batch])
+        except Exception as e:
+            log.error("Language detection failed (%d texts): %s", len(batch), e)
+            langs = [None] * len(batch)
+        finally:
+            LANGDETECT_SECONDS.observe(time.perf_counter() - t0)
+            self._batch_task = asyncio.create_task(self._detect_soon()) if self._pending else None
+        for (_, fut), lang in zip(batch, langs):
+            if not fut.done():
+                fut.set_result(lang)
+
+    async def for_user(self, user_id: int, text: str) -> Optional[str]:
+        """The user's detected language, running detection on ``text`` only if still undecided."""
+        if not self.enabled:
+            return None
+        tries, lang = self._users.get(user_id, (0, None))
+        if lang or tries >= self.max_tries:
+            self._users.move_to_end(user_id)
+            return lang
+        if len(_LETTERS.findall(text)) < self.min_chars:
+            LANG_DETECTIONS.inc("skipped")
+            return None
+        lang = await self.detect(text)
+        LANG_DETECTIONS.inc("detected" if lang else "unsure")
+        self._users[user_id] = (tries + 1, lang)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.cache_size:
+            self._users.popitem(last=False)
+        return lang
+
+language_detector = LanguageDetector(
+    config.SUPPORTED_LANGS,
+    min_chars=config.LANGDETECT_MIN_CHARS,
+    min_prob=config.LANGDETECT_MIN_PROB,
+    max_tries=config.LANGDETECT_MAX_TRIES,
+    cache_size=config.LANGDETECT_CACHE_SIZE,
+)
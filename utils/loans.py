@@ -0,0 +1,137 @@
+# utils/loans.py
+"""Loan engine: amortization schedules for one offer or a batch of them, without per-month loops.
+
+Every offer is an annuity with an optional balloon (a lump sum due with the last
+payment). Schedules of a batch share one ``(offers, months)`` array, padded with
+zeros after each offer's last month.
+"""
+import csv, io, math, re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import config
+from utils.solar import frozen
+
+# what the bot computes at all: longer terms, higher rates or bigger batches are typos or abuse
+MAX_MONTHS = 600
+MAX_RATE_PCT = 100
+MAX_OFFERS = 10
+
+@dataclass(frozen=True)
+class Offer:
+    amount: float
+    months: int
+    rate_pct: float       # nominal yearly rate, compounded monthly; 0 = interest-free
+    balloon: float = 0.0  # paid on top of the last instalment
+
+    @classmethod
+    def of(cls, amount: float, years: float, rate_pct: float, balloon: float = 0.0) -> "Offer":
+        if not all(map(math.isfinite, (amount, years, rate_pct, balloon))):
+            raise ValueError("bad values")  # hundreds of digits parse as inf
+        offer = cls(round(amount, 2), int(round(years * 12)), round(rate_pct, 3), round(balloon, 2))
+        if (not 0 < offer.months <= MAX_MONTHS or not 0 <= offer.rate_pct <= MAX_RATE_PCT
+                or offer.amount <= 0 or not 0 <= offer.balloon < offer.amount):
+            raise ValueError("bad values")
+        return offer
+
+@dataclass(frozen=True)
+class Schedules:
+    offers: Tuple[Offer, ...]
+    payment: np.ndarray    # regular monthly instalment, (O,)
+    interest: np.ndarray   # (O, N)
+    principal: np.ndarray  # (O, N), the balloon included in the last month
+    balance: np.ndarray    # after each payment, (O, N)
+    total: np.ndarray      # everything paid, (O,)
+
+    @property
+    def overpayment(self) -> np.ndarray:
+        return self.total - np.array([o.amount for o in self.offers])
+
+    def summary(self, i: int = 0) -> Tuple[float, float, float]:
+        """(monthly, total, overpayment) rounded to cents, as ``loan_calc`` returns them."""
+        return round(float(self.payment[i]), 2), round(float(self.total[i]), 2), round(float(self.overpayment[i]), 2)
+
+    def best(self) -> int:
+        """Index of the offer with the smallest overpayment."""
+        return int(np.argmin(self.overpayment))
+
+    def to_csv(self, i: int = 0, out: Optional[io.TextIOBase] = None) -> Optional[str]:
+        """Schedule of offer ``i`` as CSV; written to ``out`` or returned as a string."""
+        n = self.offers[i].months
+        buf = out or io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(["month", "payment", "interest", "principal", "balance"])
+        paid = self.interest[i, :n] + self.principal[i, :n]
+        w.writerows(zip(range(1, n + 1), *(np.round(a, 2).tolist() for a in
+                                          (paid, self.interest[i, :n], self.principal[i, :n], self.balance[i, :n]))))
+        return None if out else buf.getvalue()
+
+@lru_cache(maxsize=config.LOAN_CACHE_SIZE)
+def _schedules(offers: Tuple[Offer, ...]) -> Schedules:
+    P = np.array([o.amount for o in offers])[:, None]
+    B = np.array([o.balloon for o in offers])[:, None]
+    n = np.array([o.months for o in offers])[:, None]
+    r = np.array([o.rate_pct for o in offers])[:, None] / 1200
+    k = np.arange(1, int(n.max()) + 1)[None, :]                 # payment number
+    live = k <= n
+
+    zero = r == 0
+    rs = np.where(zero, 1.0, r)                                  # safe divisor
+    with np.errstate(over="ignore", invalid="ignore"):         # absurd amounts: rejected below
+        g_n = (1 + r) ** n
+        pmt = np.where(zero, (P - B) / n, (P * g_n - B) * rs / np.where(zero, 1.0, g_n - 1))
+        g_k = (1 + r) ** np.minimum(k, n)
+        balance = np.where(zero, P - pmt * np.minimum(k, n), P * g_k - pmt * (g_k - 1) / rs)
+        balance = np.where(k >= n, 0.0, balance)                 # the balloon clears what is left
+        before = np.concatenate([P, balance[:, :-1]], axis=1)
+        interest = np.where(live, before * r, 0.0)
+        principal = np.where(live, before - balance, 0.0)
+        total = (pmt * n + B)[:, 0]
+    if not (np.isfinite(total).all() and np.isfinite(balance).all()):
+        raise ValueError("bad values")
+    return Schedules(offers, frozen(pmt[:, 0]), frozen(interest), frozen(principal), frozen(balance), frozen(total))
+
+def compare(offers: Sequence[Offer]) -> Schedules:
+    """Schedules for a batch of offers in one vectorized pass (memoized per batch)."""
+    if not offers:
+        raise ValueError("no offers")
+    if len(offers) > MAX_OFFERS:
+        raise ValueError("too many offers")
+    return _schedules(tuple(offers))
+
+def schedule(amount: float, years: float, rate_pct: float, balloon: float = 0.0) -> Schedules:
+    return compare([Offer.of(amount, years, rate_pct, balloon)])
+
+# ===== free-form input =====
+
+_AMOUNT = re.compile(r"^\s*\d{1,3}(?:[  ']\d{3})+(?![\d.])")  # "8 000" in the leading amount only: "5 8 500" stays three numbers
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?)\s*(k|к|тыс\w*)?\s*(%|m\b|mo\w*|мес\w*|mies\w*|mes\w*|monat\w*|міс\w*)?", re.I)
+
+def parse_offers(text: str) -> List[Offer]:
+    """``AMOUNT TERM RATE [BALLOON]`` per offer; offers separated by ';' or new lines.
+
+    Accepts thousands separators in the amount (``8 000``), ``k`` suffixes (``8k``), ``%`` signs,
+    currency and unit words, and terms in months (``60m``, ``60 мес``); otherwise the
+    term is in years. Raises ValueError on anything else, and beyond :data:`MAX_MONTHS`,
+    :data:`MAX_RATE_PCT` or :data:`MAX_OFFERS`.
+    """
+    offers = []
+    for chunk in re.split(r"[;\n]+", text.replace(",", ".")):
+        nums = []
+        for m in _NUMBER.finditer(_AMOUNT.sub(lambda m: re.sub(r"\D", "", m.group()), chunk)):
+            value = float(m.group(1)) * (1000 if m.group(2) else 1)
+            months = bool(m.group(3)) and m.group(3) != "%"
+            nums.append((value, months))
+        if not nums:
+            continue
+        if len(nums) not in (3, 4):
+            raise ValueError("bad format")
+        (amount, _), (term, in_months), (rate, _) = nums[:3]
+        balloon = nums[3][0] if len(nums) == 4 else 0.0
+        offers.append(Offer.of(amount, term / 12 if in_months else term, rate, balloon))
+        if len(offers) > MAX_OFFERS:
+            raise ValueError("too many offers")
+    if not offers:
+        raise ValueError("bad format")
+    return offers
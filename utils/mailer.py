@@ -0,0 +1,219 @@
+# utils/mailer.py
+import asyncio, logging, queue, smtplib, ssl, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import Deque, List, Optional
+from utils.metrics import LEAD_EMAILS, SMTP_SECONDS
+import config
+
+log = logging.getLogger("mailer")
+
+class SMTPPool:
+    """Persistent smtplib connections for worker threads.
+
+    A connection is opened on first use and reused until it has been idle for
+    ``idle`` seconds or the server drops it (then one fresh attempt is made).
+    STARTTLS is used whenever the server offers it; credentials are never sent
+    over a connection that is not encrypted.
+    """
+
+    def __init__(self, host: str, port: int, user: str = "", password: str = "", size: int = 1,
+                 timeout: float = 15.0, idle: float = 60.0):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.size = max(1, size)
+        self.timeout, self.idle = timeout, idle
+        self._idle: "queue.LifoQueue[tuple]" = queue.LifoQueue()  # (connection, last used)
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.port == 465:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+            secure = True
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.ehlo()
+            secure = smtp.has_extn("starttls")
+            if secure:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+        if self.user:
+            if not secure:
+                smtp.close()
+                raise smtplib.SMTPException(f"{self.host} offers no TLS; not sending credentials in clear text")
+            smtp.login(self.user, self.password)
+        return smtp
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                smtp, used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - used < self.idle:
+                return smtp
+            _quit(smtp)
+
+    def send(self, msg: EmailMessage):
+        """Blocking; call from a thread."""
+        smtp = self._checkout()
+        try:
+            smtp.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            _quit(smtp)
+            smtp = self._connect()
+            smtp.send_message(msg)
+        except Exception:
+            _quit(smtp)  # unknown state: don't put it back
+            raise
+        self._idle.put((smtp, time.monotonic()))
+
+    def close(self):
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _quit(smtp)
+
+def _quit(smtp: smtplib.SMTP):
+    try:
+        smtp.quit()
+    except Exception:
+        smtp.close()
+
+def permanent(e: Exception) -> bool:
+    """The server rejected this message for good (5xx): sending it again cannot help.
+    Connection, TLS and login problems, and 4xx replies, are worth retrying."""
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return bool(e.recipients) and all(code >= 500 for code, _ in e.recipients.values())
+    return (isinstance(e, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError))
+            and getattr(e, "smtp_code", 0) >= 500)
+
+def _lead_lines(lead: dict) -> str:
+    text = (f"Name: {lead['name']}\nPhone: {lead['phone']}\nCity: {lead['city']}\nNote: {lead['note']}\n"
+            f"Lang: {lead['lang']}\nUser: @{lead['username']} ({lead['chat_id']})\nTime (UTC): {lead['ts']}")
+    return "(updated)\n" + text if lead.get("updated") else text
+
+def lead_email(leads: List[dict], sender: str, recipients: List[str]) -> EmailMessage:
+    """One email per lead, or a digest listing all of them."""
+    msg = EmailMessage()
+    msg["From"], msg["To"] = sender, ", ".join(recipients)
+    if len(leads) == 1:
+        lead = leads[0]
+        msg["Subject"] = f"{'🔁 Lead updated' if lead.get('updated') else '🆕 Lead'}: {lead['name']}, {lead['city']}"
+        msg.set_content(_lead_lines(lead))
+    else:
+        msg["Subject"] = f"📥 {len(leads)} new leads"
+        msg.set_content("\n\n".join(f"#{i}\n{_lead_lines(lead)}" for i, lead in enumerate(leads, 1)))
+    return msg
+
+class LeadMailer:
+    """Lead emails sent by background tasks, one per pooled SMTP connection.
+
+    ``submit`` only queues the lead, so ``form_note`` never waits on SMTP. Each
+    send takes everything queued (up to ``batch_size``): one lead makes a normal
+    email, more make a digest. A batch that failed for a transient reason goes
+    back to the head of the queue and is retried with exponential backoff; one the
+    server rejected for good (:func:`permanent`) is logged, leads included, and dropped
+    so it does not hold up the rest.
+    """
+
+    def __init__(self, pool: SMTPPool, sender: str, recipients: List[str], batch_size: int = 50,
+                 max_backoff: float = 300.0):
+        self.pool = pool
+        self.sender, self.recipients = sender, recipients
+        self.batch_size = max(1, batch_size)
+        self.max_backoff = max_backoff
+        self._queue: Deque[dict] = deque()
+        self._has_leads = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.recipients and self.pool.host)
+
+    def submit(self, lead: dict):
+        if not self.enabled:
+            return
+        self._queue.append(lead)
+        LEAD_EMAILS.inc("queued")
+        self._has_leads.set()
+
+    async def start(self):
+        if not self.enabled or self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+        self._tasks = [asyncio.create_task(self._run(), name=f"mailer-{i}") for i in range(self.pool.size)]
+
+    async def close(self, timeout: float = 10.0):
+        """Let in-flight sends finish, try once more to deliver what is queued, close the connections."""
+        if not self._tasks:
+            return
+        self._stop.set()
+        self._has_leads.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            while self._queue:
+                await asyncio.wait_for(self._send(self._take()), timeout)
+        except Exception as e:
+            log.error("Lead emails not sent on shutdown (%d leads): %s", len(self._queue), e)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.pool.close)
+        self._executor.shutdown(wait=False)
+
+    def _take(self) -> List[dict]:
+        n = min(len(self._queue), self.batch_size)
+        return [self._queue.popleft() for _ in range(n)]
+
+    async def _send(self, batch: List[dict]):
+        msg = lead_email(batch, self.sender, self.recipients)
+        t0 = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.pool.send, msg)
+        except Exception as e:
+            if permanent(e):
+                LEAD_EMAILS.inc("dropped")
+                log.error("Lead email rejected, dropped (%d leads: %s): %s", len(batch),
+                          "; ".join(f"{lead['name']} {lead['phone']}" for lead in batch), e)
+                return
+            self._queue.extendleft(reversed(batch))
+            raise
+        except BaseException:
+            self._queue.extendleft(reversed(batch))
+            raise
+        finally:
+            SMTP_SECONDS.observe(time.perf_counter() - t0)
+        LEAD_EMAILS.inc("sent")
+        if len(batch) > 1:
+            LEAD_EMAILS.inc("digest")
+
+    async def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            if not self._queue:
+                self._has_leads.clear()
+                await self._has_leads.wait()
+                continue
+            try:
+                await self._send(self._take())
+                backoff = 1.0
+            except Exception as e:
+                LEAD_EMAILS.inc("failed")
+                log.error("Lead email failed (%d queued, retry in %.0fs): %s", len(self._queue), backoff, e)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, self.max_backoff)
+
+mailer = LeadMailer(
+    SMTPPool(config.SMTP_HOST, config.SMTP_PORT, config.SMTP_USER, config.SMTP_PASS, size=config.SMTP_CONNECTIONS,
+             timeout=config.SMTP_TIMEOUT_SEC, idle=config.SMTP_IDLE_SEC),
+    config.MAIL_FROM, config.LEADS_EMAILS, batch_size=config.MAIL_BATCH_SIZE, max_backoff=config.MAIL_MAX_BACKOFF_SEC,
+)
@@ -0,0 +1,197 @@
+# utils/metrics.py
+import asyncio, bisect, functools, logging, time
+from typing import Dict, Optional, Sequence, Tuple
+from telegram.request import HTTPXRequest
+
+log = logging.getLogger("metrics")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        registry.register(self)
+
+    def _fmt_labels(self, values: Tuple, extra: str = "") -> str:
+        parts = [f"{k}={_quote(str(v))}" for k, v in zip(self.labels, values)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        super().__init__(name, doc, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self):
+        for labels, v in self.values.items():
+            yield f"{self.name}{self._fmt_labels(labels)} {v:g}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; ``observe`` is a bisect plus two adds."""
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        s[bisect.bisect_left(self.buckets, value)] += 1
+        s[-1] += value
+
+    def render(self):
+        for labels, s in self.series.items():
+            acc = 0
+            for le, n in zip(self.buckets, s):
+                acc += n
+                yield f"{self.name}_bucket{self._fmt_labels(labels, 'le=' + _quote(f'{le:g}'))} {acc}"
+            acc += s[len(self.buckets)]
+            yield f"{self.name}_bucket{self._fmt_labels(labels, 'le=' + _quote('+Inf'))} {acc}"
+            yield f"{self.name}_sum{self._fmt_labels(labels)} {s[-1]:g}"
+            yield f"{self.name}_count{self._fmt_labels(labels)} {acc}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: _Metric):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        out = []
+        for m in self.metrics:
+            out.append(f"# HELP {m.name} {m.doc}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _quote(v: str) -> str:
+    return '"' + _escape(v) + '"'
+
+registry = Registry()
+
+# ===== bot metrics =====
+
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Handler callback duration", ["handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Handler callbacks that raised", ["handler"])
+STATE_TRANSITIONS = Counter("bot_conversation_transitions_total",
+                            "Conversation states returned by handlers (-1 = END)", ["handler", "state"])
+UPDATE_WAIT = Histogram("update_wait_seconds", "Time an update, already holding a slot, waited for its chat's "
+                        "earlier updates", ["stage"])
+UPDATES_WAITING = Gauge("updates_waiting", "Updates queued behind an earlier update of the same chat")
+CHAT_QUEUE_DEPTH = Histogram("update_chat_queue_depth", "Updates of the same chat already queued or running when one arrives",
+                             buckets=(0, 1, 2, 3, 5, 10, 20, 50))
+SHEETS_SECONDS = Histogram("sheets_request_seconds", "Google Sheets call duration", ["op"])
+SHEETS_ERRORS = Counter("sheets_errors_total", "Google Sheets call failures", ["op"])
+SHEETS_ROWS = Counter("sheets_rows_total", "Rows appended to Google Sheets")
+LEADS_DEDUPED = Counter("leads_deduplicated_total", "Repeated leads: merged updates and dropped duplicates", ["outcome"])
+LANG_DETECTIONS = Counter("lang_detections_total", "Language detection attempts: detected, unsure, skipped", ["outcome"])
+LANGDETECT_SECONDS = Histogram("langdetect_batch_seconds", "Language detection batch duration")
+TELEGRAM_SECONDS = Histogram("telegram_request_seconds", "Outgoing Bot API request duration", ["method"])
+TELEGRAM_ERRORS = Counter("telegram_request_errors_total", "Outgoing Bot API requests that failed", ["method"])
+OUTBOX_WAIT = Histogram("outbox_wait_seconds", "Time an outgoing call waited for rate-limit tokens", ["priority"])
+OUTBOX_QUEUED = Gauge("outbox_queued", "Outgoing calls waiting for a global token")
+OUTBOX_RETRY_AFTER = Counter("outbox_retry_after_total", "429 RetryAfter responses from Telegram", ["method"])
+ADMIN_ALERTS = Counter("admin_alerts_total", "Admin lead alerts: queued, sent messages, digests, failures, dropped alerts", ["event"])
+SMTP_SECONDS = Histogram("smtp_send_seconds", "SMTP send duration, connecting included")
+LEAD_EMAILS = Counter("lead_emails_total", "Lead emails: queued leads, sent emails, digests, failures, dropped emails", ["event"])
+LOOP_LAG = Histogram("event_loop_lag_seconds", "Event loop scheduling delay",
+                     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+STARTUP_SECONDS = Gauge("bot_startup_seconds", "Startup phases, seconds since process start or phase duration",
+                        ["phase"])
+LOOP_LAG_MAX = Gauge("event_loop_lag_max_seconds", "Worst event loop delay since the last scrape")
+
+def timed(fn):
+    """Handler decorator: duration, errors and, for conversation steps, the returned state."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - t0, name)
+        if isinstance(result, int):
+            STATE_TRANSITIONS.inc(name, result)
+        return result
+    return wrapper
+
+class TimedRequest(HTTPXRequest):
+    """HTTPXRequest that records the latency of every outgoing Bot API call."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        t0 = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            TELEGRAM_ERRORS.inc(api_method)
+            raise
+        finally:
+            TELEGRAM_SECONDS.observe(time.perf_counter() - t0, api_method)
+
+async def sample_loop_lag(interval: float = 0.5):
+    """Sleep ``interval`` and record how late the loop woke us up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - t0 - interval)
+        LOOP_LAG.observe(lag)
+        if lag > LOOP_LAG_MAX.values.get((), 0.0):
+            LOOP_LAG_MAX.set(lag)
+
+class MetricsServer:
+    """GET /metrics in Prometheus text format, plus the loop-lag sampler."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self._runner = None
+        self._sampler: Optional[asyncio.Task] = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def handle(request):
+            body = registry.render()
+            LOOP_LAG_MAX.set(0.0)
+            return web.Response(text=body, content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._sampler = asyncio.create_task(sample_loop_lag(), name="loop-lag")
+        log.info("Metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._sampler:
+            self._sampler.cancel()
+            await asyncio.gather(self._sampler, return_exceptions=True)
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,181 @@
+# utils/persistence.py
+import asyncio, json, logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from telegram.ext import BasePersistence, PersistenceInput
+from config import PERSISTENCE_PATH, PERSISTENCE_FLUSH_SEC, PERSISTENCE_CACHE_USERS
+from .db import open_db
+
+log = logging.getLogger("persistence")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL, key TEXT NOT NULL, state TEXT NOT NULL, PRIMARY KEY (name, key)
+);
+"""
+
+class SQLitePersistence(BasePersistence):
+    """user_data and ConversationHandler states in SQLite, one row per user / conversation.
+
+    * Lazy: ``get_user_data`` returns nothing at startup; a user's row is read on
+      the first ``refresh_user_data`` for that user.
+    * Dirty tracking: PTB reports every user it touched; rows whose JSON did not
+      change since the last write are skipped.
+    * Bounded: what is known per user (loaded, hash of the last write) lives in
+      an LRU of ``max_users``; for an evicted user the row is just read, and
+      written, once more.
+    * Coalescing: all ``update_*`` calls of one PTB persistence run
+      (every ``PERSISTENCE_FLUSH_SEC``) are written in a single transaction.
+
+    Only JSON-serializable values are stored; bot_data, chat_data and
+    callback_data are not used by this bot and are not persisted.
+    """
+
+    def __init__(self, path: str = PERSISTENCE_PATH, update_interval: float = PERSISTENCE_FLUSH_SEC,
+                 max_users: int = PERSISTENCE_CACHE_USERS):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistence")
+        self.max_users = max(1, max_users)
+        # user_id -> hash of the JSON last read or written (None: no row); a key means "already loaded"
+        self._seen: "OrderedDict[int, Optional[int]]" = OrderedDict()
+        self._dirty_users: Dict[int, Optional[str]] = {}  # None -> delete
+        self._dirty_convs: Dict[Tuple[str, str], Optional[str]] = {}
+        self._write_task: Optional[asyncio.Task] = None
+
+    async def _call(self, fn, *args):
+        if self._conn is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _open(self):
+        if self._conn is None:
+            self._conn = open_db(self.path)
+            self._conn.executescript(SCHEMA)
+
+    # ===== loading =====
+
+    async def get_user_data(self) -> Dict[int, dict]:
+        return {}
+
+    def _remember(self, user_id: int, digest: Optional[int]):
+        self._seen[user_id] = digest
+        self._seen.move_to_end(user_id)
+        while len(self._seen) > self.max_users:
+            self._seen.popitem(last=False)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        if user_id in self._seen:
+            self._seen.move_to_end(user_id)
+            return
+        self._remember(user_id, None)
+        row = await self._call(lambda: self._conn.execute(
+            "SELECT data FROM user_data WHERE user_id = ?", (user_id,)).fetchone())
+        if row:
+            self._remember(user_id, hash(row[0]))
+            for k, v in json.loads(row[0]).items():
+                user_data.setdefault(k, v)  # values set in memory meanwhile win
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        rows = await self._call(lambda: self._conn.execute(
+            "SELECT key, state FROM conversations WHERE name = ?", (name,)).fetchall())
+        return {tuple(json.loads(k)): json.loads(s) for k, s in rows}
+
+    # ===== saving =====
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        raw = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+        if self._seen.get(user_id) == hash(raw):
+            return
+        self._dirty_users[user_id] = raw
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._dirty_users[user_id] = None
+        self._schedule_write()
+
+    async def update_conversation(self, name: str, key: Tuple[int, ...], new_state: Optional[object]) -> None:
+        state = None if new_state is None else json.dumps(new_state)
+        self._dirty_convs[(name, json.dumps(list(key)))] = state
+        self._schedule_write()
+
+    def _schedule_write(self):
+        # PTB gathers all update_* coroutines of a run at once; the write task
+        # starts on the next loop iteration and picks them all up
+        if self._write_task is None:
+            self._write_task = asyncio.create_task(self._write())
+
+    async def _write(self):
+        try:
+            await asyncio.sleep(0)
+            users, self._dirty_users = self._dirty_users, {}
+            convs, self._dirty_convs = self._dirty_convs, {}
+            if users or convs:
+                await self._call(self._write_rows, users, convs)
+                for user_id, raw in users.items():
+                    self._remember(user_id, None if raw is None else hash(raw))
+        except Exception as e:
+            log.error("Persistence write error: %s", e)
+        finally:
+            self._write_task = None
+            if self._dirty_users or self._dirty_convs:
+                self._schedule_write()
+
+    def _write_rows(self, users: Dict[int, Optional[str]], convs: Dict[Tuple[str, str], Optional[str]]):
+        cur = self._conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            cur.executemany("INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                            [(u, raw) for u, raw in users.items() if raw is not None])
+            cur.executemany("DELETE FROM user_data WHERE user_id = ?",
+                            [(u,) for u, raw in users.items() if raw is None])
+            cur.executemany("INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                            [(n, k, s) for (n, k), s in convs.items() if s is not None])
+            cur.executemany("DELETE FROM conversations WHERE name = ? AND key = ?",
+                            [(n, k) for (n, k), s in convs.items() if s is None])
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    async def flush(self) -> None:
+        while self._write_task:
+            await self._write_task
+        if self._conn is not None:
+            await self._call(self._conn.close)
+            self._conn = None
+
+    # ===== unused stores =====
+
+    async def get_chat_data(self) -> Dict[int, dict]:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
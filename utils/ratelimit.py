@@ -0,0 +1,238 @@
+# utils/ratelimit.py
+import asyncio, heapq, itertools, logging, time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from telegram import Update
+from telegram.error import RetryAfter
+from telegram.ext import ApplicationHandlerStop, BaseRateLimiter, ContextTypes
+import config
+from utils.metrics import OUTBOX_QUEUED, OUTBOX_RETRY_AFTER, OUTBOX_WAIT
+
+log = logging.getLogger("ratelimit")
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+class BucketStore:
+    """Token buckets keyed by id, with bounded memory.
+
+    Keys live in an LRU ``OrderedDict``. A bucket untouched for ``ttl`` seconds
+    has refilled completely, so dropping it is indistinguishable from keeping it;
+    such buckets are evicted from the cold end on every call (amortized O(1)),
+    and ``max_keys`` caps the size during a burst of distinct senders.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 50000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self.ttl = self.burst / rate if rate > 0 else float("inf")
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _get(self, key: Hashable, now: float) -> TokenBucket:
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return b
+
+    def allow(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        b = self._get(key, now)
+        b.tokens = min(self.burst, b.tokens + (now - b.updated) * self.rate)
+        b.updated = now
+        if b.tokens >= cost:
+            b.tokens -= cost
+            return True
+        return False
+
+    def reserve(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take ``cost`` tokens even if they are not there yet; returns how long to wait before using them.
+
+        A shortfall is stored as an empty bucket dated in the future (when the debt is paid off),
+        so later callers queue up behind earlier ones and the bucket is not evicted meanwhile.
+        """
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        b = self._get(key, now)
+        tokens = min(self.burst, b.tokens + (now - b.updated) * self.rate) - cost
+        if tokens >= 0:
+            b.tokens, b.updated = max(tokens, 0.0), now
+            return 0.0
+        wait = -tokens / self.rate
+        b.tokens, b.updated = 0.0, now + wait
+        return wait
+
+    def _evict(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            key, b = next(iter(buckets.items()))
+            if now - b.updated < self.ttl:
+                break
+            del buckets[key]
+
+class FloodGuard:
+    """Early update handler: drops updates from users/chats that exceed their bucket."""
+
+    def __init__(self, user_rate: float, user_burst: float, chat_rate: float, chat_burst: float, max_keys: int):
+        self.users = BucketStore(user_rate, user_burst, max_keys)
+        self.chats = BucketStore(chat_rate, chat_burst, max_keys)
+        self.dropped = 0
+
+    def check(self, user_id: Optional[int], chat_id: Optional[int]) -> bool:
+        now = time.monotonic()
+        if user_id is not None and not self.users.allow(user_id, now=now):
+            return False
+        if chat_id is not None and chat_id != user_id and not self.chats.allow(chat_id, now=now):
+            return False
+        return True
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        chat = update.effective_chat
+        if self.check(user.id if user else None, chat.id if chat else None):
+            return
+        self.dropped += 1
+        log.debug("Flood: dropped update %s from user %s chat %s", update.update_id,
+                  user.id if user else None, chat.id if chat else None)
+        raise ApplicationHandlerStop
+
+# ===== outgoing =====
+
+PRIORITY_USER = 0    # replies to users
+PRIORITY_ADMIN = 10  # admin alerts/digests: sent when nobody is waiting for a reply
+
+class OutboundLimiter(BaseRateLimiter[int]):
+    """Keeps outgoing Bot API calls under Telegram's limits instead of collecting 429s.
+
+    Every call that targets a chat first reserves a token in that chat's bucket
+    (private chats and groups have separate limits), which keeps each chat's
+    messages in order, then waits for a global token. Global tokens go to the
+    waiter with the lowest ``rate_limit_args`` (priority, default
+    :data:`PRIORITY_USER`) first. A ``RetryAfter`` pauses all sending for the
+    time Telegram asks and the call is retried up to ``max_retries`` times.
+    Calls without a chat (getUpdates, getMe, answerCallbackQuery...) pass through.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float, group_rate: float,
+                 group_burst: float, max_retries: int = 3, max_keys: int = 50000):
+        self.global_rate = global_rate
+        self.chats = BucketStore(chat_rate, chat_burst, max_keys) if chat_rate > 0 else None
+        self.groups = BucketStore(group_rate, group_burst, max_keys) if group_rate > 0 else None
+        self.max_retries = max_retries
+        self._tokens = 1.0  # global sends are paced evenly, without bursts: Telegram counts them over short windows
+        self._updated = time.monotonic()
+        self._waiters: List[tuple] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def initialize(self) -> None:
+        if self.global_rate > 0 and not self._dispatcher:
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="outbound-limiter")
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for _, _, fut in self._waiters:
+            if not fut.done():
+                fut.set_result(None)  # let whatever is still queued go out unthrottled
+        self._waiters.clear()
+
+    def _take_global(self, now: float) -> float:
+        """Take a global token if there is one; else seconds until there will be."""
+        self._tokens = min(1.0, self._tokens + (now - self._updated) * self.global_rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.global_rate
+
+    async def _dispatch(self):
+        while True:
+            while not self._waiters:
+                self._wake.clear()
+                await self._wake.wait()
+            await self._resume.wait()
+            wait = self._take_global(time.monotonic())
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            while self._waiters:
+                _, _, fut = heapq.heappop(self._waiters)
+                if not fut.done():
+                    fut.set_result(None)
+                    break
+            else:
+                self._tokens += 1  # every waiter gave up; keep the token
+            OUTBOX_QUEUED.set(len(self._waiters))
+
+    async def _acquire(self, chat_id, priority: int):
+        if chat_id is None:
+            return
+        chat = chat_id if isinstance(chat_id, int) else str(chat_id)
+        store = self.groups if isinstance(chat, str) or chat < 0 else self.chats
+        if store:
+            wait = store.reserve(chat)
+            if wait:
+                await asyncio.sleep(wait)
+        await self._resume.wait()
+        if not self._dispatcher:
+            return
+        if not self._waiters and not self._take_global(time.monotonic()):
+            return  # fast path: nobody queued and a token at hand
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        OUTBOX_QUEUED.set(len(self._waiters))
+        self._wake.set()
+        await fut
+
+    async def process_request(self, callback, args: Any, kwargs: Dict[str, Any], endpoint: str,
+                              data: Dict[str, Any], rate_limit_args: Optional[int]):
+        chat_id = data.get("chat_id")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        priority = PRIORITY_USER if rate_limit_args is None else rate_limit_args
+        for attempt in range(self.max_retries + 1):
+            t0 = time.perf_counter()
+            await self._acquire(chat_id, priority)
+            OUTBOX_WAIT.observe(time.perf_counter() - t0, "admin" if priority >= PRIORITY_ADMIN else "user")
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                OUTBOX_RETRY_AFTER.inc(endpoint)
+                if attempt == self.max_retries:
+                    log.error("%s to %s: still rate limited after %d retries", endpoint, chat_id, attempt)
+                    raise
+                log.warning("%s to %s: rate limited, pausing sends for %ss", endpoint, chat_id, e.retry_after)
+                if self._resume.is_set():
+                    self._resume.clear()
+                    try:
+                        await asyncio.sleep(float(e.retry_after) + 0.1)
+                    finally:
+                        self._resume.set()
+
+flood_guard = FloodGuard(
+    user_rate=1 / max(config.ANTI_FLOOD_WINDOW_SEC, 0.001),
+    user_burst=config.ANTI_FLOOD_BURST,
+    chat_rate=config.ANTI_FLOOD_CHAT_RATE,
+    chat_burst=config.ANTI_FLOOD_CHAT_BURST,
+    max_keys=config.ANTI_FLOOD_MAX_KEYS,
+)
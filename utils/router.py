@@ -0,0 +1,93 @@
+# utils/router.py
+import re
+from typing import Dict, Iterable, Optional
+from telegram import Message
+from telegram.ext import filters
+from .texts import TEXTS
+
+# menu button key in TEXTS -> intent
+MENU_INTENTS = {
+    "menu_form": "form",
+    "menu_credit": "credit",
+    "menu_solar": "solar",
+    "menu_about": "about",
+    "menu_services": "services",
+    "menu_site": "site",
+    "menu_whatsapp": "whatsapp",
+    "menu_call": "call",
+    "menu_lang": "lang",
+}
+
+# short words people type instead of pressing the button; only match as the whole message
+ALIASES = {
+    "form": ["заявка", "solicitud", "request", "zgłoszenie", "anfrage"],
+    "credit": ["кредит", "loan", "crédito", "kredyt", "kredit", "кредитний"],
+    "solar": ["солнечный", "solar", "słoneczny", "pv", "сонячний"],
+}
+
+# free-text keywords, matched at a word start anywhere in the message
+KEYWORDS = {
+    "price": ["цена", "стоимость"],
+    "contact": ["контакт", "телефон"],
+}
+
+_EDGE = r"[\W_]*"  # emoji, punctuation and spaces around a label
+
+def _norm(label: str) -> str:
+    return re.sub(r"^[\W_]+|[\W_]+$", "", label).casefold()
+
+class IntentRouter:
+    """Maps message text to an intent with one compiled regex per kind of match.
+
+    Menu labels of every language and the aliases form a single anchored
+    alternation, so a whole-message match costs one ``fullmatch`` regardless of
+    how many flows and languages exist, and "PV" inside a sentence is not a
+    menu press. Keywords are a second alternation searched at word starts.
+    """
+
+    def __init__(self, texts: Dict[str, Dict[str, str]] = TEXTS):
+        self.labels: Dict[str, str] = {}
+        for key, intent in MENU_INTENTS.items():
+            for label in texts.get(key, {}).values():
+                self.labels[_norm(label)] = intent
+        for intent, words in ALIASES.items():
+            for w in words:
+                self.labels.setdefault(_norm(w), intent)
+        self.keywords = {w.casefold(): intent for intent, words in KEYWORDS.items() for w in words}
+        self._menu_re = re.compile(f"{_EDGE}({_alternation(self.labels)}){_EDGE}", re.IGNORECASE)
+        self._kw_re = re.compile(rf"(?<!\w)({_alternation(self.keywords)})", re.IGNORECASE)
+        self._last = (None, None)
+
+    def route(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return None
+        # every ConversationHandler entry point asks about the same message in turn
+        last_text, last_intent = self._last
+        if text is last_text:
+            return last_intent
+        m = self._menu_re.fullmatch(text.strip())
+        if m:
+            intent = self.labels.get(m.group(1).casefold())
+        else:
+            m = self._kw_re.search(text)
+            intent = self.keywords.get(m.group(1).casefold()) if m else None
+        self._last = (text, intent)
+        return intent
+
+def _alternation(words: Iterable[str]) -> str:
+    # longest first so a label never loses to its own prefix
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+router = IntentRouter()
+
+class IntentFilter(filters.MessageFilter):
+    """``filters.Regex`` replacement for entry points: passes messages routed to ``intent``."""
+
+    __slots__ = ("intent",)
+
+    def __init__(self, intent: str):
+        super().__init__(name=f"IntentFilter({intent})")
+        self.intent = intent
+
+    def filter(self, message: Message) -> bool:
+        return router.route(message.text) == self.intent
@@ -0,0 +1,231 @@
+# utils/sharding.py
+import asyncio, bisect, hashlib, logging, os, queue, signal
+import multiprocessing as mp
+from typing import Awaitable, Callable, List, Optional
+import config
+
+log = logging.getLogger("sharding")
+
+# update fields that carry the chat the update belongs to, in lookup order
+_CHAT_FIELDS = ("message", "edited_message", "channel_post", "edited_channel_post", "my_chat_member",
+                "chat_member", "chat_join_request")
+_USER_FIELDS = ("callback_query", "inline_query", "chosen_inline_result", "shipping_query",
+                "pre_checkout_query", "poll_answer")
+
+def shard_key(data: dict) -> int:
+    """Chat id of a raw update dict (user id for updates without a chat)."""
+    for field in _CHAT_FIELDS:
+        obj = data.get(field)
+        if obj and "chat" in obj:
+            return obj["chat"]["id"]
+    for field in _USER_FIELDS:
+        obj = data.get(field)
+        if obj:
+            msg = obj.get("message")
+            if msg and "chat" in msg:
+                return msg["chat"]["id"]
+            user = obj.get("from") or obj.get("user")
+            if user:
+                return user["id"]
+    return data.get("update_id", 0)
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring: a chat always maps to the same worker, and changing
+    the worker count moves only ~1/N of the chats."""
+
+    def __init__(self, nodes: int, vnodes: int = 64):
+        points = sorted((_hash(f"{n}:{v}"), n) for n in range(nodes) for v in range(vnodes))
+        self._keys = [p for p, _ in points]
+        self._nodes = [n for _, n in points]
+
+    def node(self, key: int) -> int:
+        i = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[i]
+
+def shard_path(path: str, index: int) -> str:
+    """data/state.sqlite3 -> data/state-2.sqlite3; each worker owns its local stores."""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{index}{ext}"
+
+# ======== WORKER ========
+
+def worker_main(index: int, inbox: "mp.Queue"):
+    # Ctrl+C and systemd's stop (SIGTERM to the whole control group) reach us too;
+    # the front stops us via the inbox, after its last update, so queues get drained
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, inbox))
+
+def _receive(inbox: "mp.Queue", poll: float = 1.0) -> Optional[dict]:
+    """Blocking: the next update, or None to stop - sent by the front, or because the front
+    is gone (OOM, SIGKILL) and nobody else would ever stop a worker that ignores SIGTERM."""
+    parent = mp.parent_process()
+    while True:
+        try:
+            return inbox.get(timeout=poll)
+        except queue.Empty:
+            if parent is not None and not parent.is_alive():
+                logging.getLogger("sharding").error("Front process is gone, worker stopping")
+                return None
+
+async def _run_worker(index: int, inbox: "mp.Queue"):
+    import main as bot
+    from telegram import Update
+    from utils.sheets import sheets
+    from utils.alerts import admin_alerts
+    from utils.mailer import mailer
+    from utils.metrics import MetricsServer
+    from utils.stats import stats
+
+    wlog = logging.getLogger(f"worker-{index}")
+    sheets.journal.path = shard_path(config.LEADS_JOURNAL_PATH, index)
+    stats.worker = index
+    application = bot.build_application(updater=False, persistence_path=shard_path(config.PERSISTENCE_PATH, index))
+    metrics = MetricsServer(config.METRICS_LISTEN, config.METRICS_PORT + 1 + index) if config.METRICS_PORT else None
+    loop = asyncio.get_running_loop()
+    async with application:
+        if metrics:
+            await metrics.start()
+        await sheets.start()
+        await admin_alerts.start(application.bot)
+        await mailer.start()
+        await application.start()
+        wlog.info("Worker %d ready", index)
+        warm = bot.mark_ready()
+        while True:
+            data = await loop.run_in_executor(None, _receive, inbox)
+            if data is None:
+                break
+            # one FIFO per worker keeps every chat's updates in arrival order
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        warm.cancel()
+        while not application.update_queue.empty():
+            await asyncio.sleep(0.05)
+        await application.stop()
+        await admin_alerts.close()
+        await mailer.close()
+        await sheets.close()
+        if metrics:
+            await metrics.stop()
+    wlog.info("Worker %d stopped", index)
+
+# ======== FRONT ========
+
+class ShardRouter:
+    def __init__(self, workers: int):
+        self._ctx = mp.get_context("spawn")
+        self.ring = HashRing(workers)
+        self.inboxes: List[mp.Queue] = [self._ctx.Queue() for _ in range(workers)]
+        self.procs = [self._spawn(i) for i in range(workers)]
+        self.routed = [0] * workers
+        self.restarts = [0] * workers
+        self.stopping = False
+
+    def _spawn(self, i: int) -> mp.Process:
+        return self._ctx.Process(target=worker_main, args=(i, self.inboxes[i]), name=f"bot-worker-{i}")
+
+    def start(self):
+        for p in self.procs:
+            p.start()
+
+    def _revive(self, i: int):
+        """Restart a worker that died. Its inbox is replaced: the dead process may have
+        held the queue's read lock, and the updates still in it are lost either way."""
+        p = self.procs[i]
+        log.error("Worker %s (pid %s) died with exit code %s; restarting it, updates queued to it are lost",
+                  p.name, p.pid, p.exitcode)
+        self.inboxes[i] = self._ctx.Queue()
+        self.procs[i] = self._spawn(i)
+        self.procs[i].start()
+        self.restarts[i] += 1
+
+    async def watch(self, interval: float = 5):
+        """Notice a dead worker even while none of its chats write."""
+        while not self.stopping:
+            for i, p in enumerate(self.procs):
+                if not p.is_alive() and not self.stopping:
+                    self._revive(i)
+            await asyncio.sleep(interval)
+
+    async def route(self, data: dict):
+        i = self.ring.node(shard_key(data))
+        if not self.procs[i].is_alive() and not self.stopping:
+            self._revive(i)
+        self.routed[i] += 1
+        self.inboxes[i].put(data)
+
+    def status(self) -> dict:
+        return {"mode": "sharded", "workers": [
+            {"pid": p.pid, "alive": p.is_alive(), "routed": n, "restarts": r}
+            for p, n, r in zip(self.procs, self.routed, self.restarts)]}
+
+    async def stop(self, timeout: float = config.SHEETS_SHUTDOWN_TIMEOUT_SEC + 10):
+        self.stopping = True
+        for q in self.inboxes:
+            q.put(None)
+        loop = asyncio.get_running_loop()
+        for p in self.procs:
+            await loop.run_in_executor(None, p.join, timeout)
+            if p.is_alive():
+                log.error("Worker %s did not stop in %.0fs, killing it", p.name, timeout)
+                p.kill()  # SIGTERM is ignored by workers
+            elif p.exitcode:
+                log.error("Worker %s exited with code %s", p.name, p.exitcode)
+
+async def _poll(bot, sink: Callable[[dict], Awaitable[None]], state: dict):
+    from telegram import Update
+    from telegram.error import NetworkError, TimedOut
+
+    while True:
+        try:
+            updates = await bot.get_updates(offset=state.get("offset"), timeout=30, allowed_updates=Update.ALL_TYPES)
+        except TimedOut:
+            continue
+        except NetworkError as e:
+            log.warning("getUpdates failed: %s", e)
+            await asyncio.sleep(1)
+            continue
+        for u in updates:
+            await sink(u.to_dict())
+            state["offset"] = u.update_id + 1
+
+async def run_sharded(workers: int, wait_for_stop: Callable[[], Awaitable[None]]):
+    """Front process: receive updates (polling or webhook) and hand each one to the
+    worker that owns its chat. Handlers only ever run inside workers."""
+    import main as bot_main
+    from telegram import Bot
+
+    router = ShardRouter(workers)
+    router.start()
+    watcher = asyncio.create_task(router.watch(), name="worker-watch")
+    bot = Bot(config.TELEGRAM_BOT_TOKEN, base_url=config.TELEGRAM_API_BASE_URL)
+    server = poller = None
+    poll_state: dict = {}
+    try:
+        async with bot:
+            # started inside the try: a failed bind or setWebhook still stops the workers below
+            try:
+                if config.BOT_MODE == "webhook":
+                    server = await bot_main.start_webhook(bot, router.route, router.status)
+                else:
+                    await bot.delete_webhook(drop_pending_updates=True)
+                    poller = asyncio.create_task(_poll(bot, router.route, poll_state), name="front-poller")
+                log.info("Front started (%s), %d workers", config.BOT_MODE, workers)
+                await wait_for_stop()
+            finally:
+                if server:
+                    await server.stop()
+                if poller:
+                    poller.cancel()
+                    await asyncio.gather(poller, return_exceptions=True)
+                    if poll_state.get("offset"):
+                        # confirm what was routed so it is not delivered again after restart
+                        await bot.get_updates(offset=poll_state["offset"], timeout=0, limit=1)
+    finally:
+        watcher.cancel()  # first: it must not revive workers that are stopping
+        await router.stop()
@@ -1,17 +1,104 @@
 # utils/sheets.py
-import logging, time
-import gspread
-from google.oauth2.service_account import Credentials
-from typing import List
-from config import get_gsheets_credentials_dict, SPREADSHEET_ID, GSHEET_NAME
+import asyncio, logging, random, re, time, zlib
+from typing import Dict, List, Optional, Tuple
+from config import (
+    get_gsheets_credentials_dict, SPREADSHEET_ID, GSHEET_NAME, GSHEET_ROTATION, GSHEET_MAX_ROWS,
+    SHEETS_BATCH_SIZE, SHEETS_FLUSH_INTERVAL_SEC,
+    SHEETS_MAX_BACKOFF_SEC, SHEETS_SHUTDOWN_TIMEOUT_SEC,
+)
+from .journal import journal, LeadJournal
+from .dedup import lead_index, LeadIndex, LeadRef
+from .metrics import SHEETS_SECONDS, SHEETS_ERRORS, SHEETS_ROWS, LEADS_DEDUPED
 
 log = logging.getLogger("sheets")
 
+HEADER = ["TimestampUTC","Username","ChatID","Lang","Type","Name","Phone","City","Note"]
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+LAST_COL = chr(ord("A") + len(HEADER) - 1)
+
+# submit_lead outcomes
+NEW, UPDATED, DUPLICATE = "new", "updated", "duplicate"
+
+def _col(name: str) -> str:
+    c = chr(ord("A") + HEADER.index(name))
+    return f"{c}2:{c}"
+
+def _cell(values: list, i: int) -> str:
+    return str(values[i][0]).strip() if i < len(values) and values[i] else ""
+
+def _first_row(resp) -> Optional[int]:
+    """First sheet row written by append_rows, from the API's updatedRange ("Leads!A5:I7" -> 5)."""
+    try:
+        m = re.search(r"(\d+)", resp["updates"]["updatedRange"].rsplit("!", 1)[-1])
+    except (KeyError, TypeError, AttributeError):
+        return None
+    return int(m.group(1)) if m else None
+
+def shard_key(title: str, name: str = GSHEET_NAME) -> Optional[Tuple[str, int]]:
+    """("2026-10", 2) for "Leads 2026-10 #2", ("", 1) for the unrotated "Leads"; None for other worksheets."""
+    m = re.fullmatch(rf"{re.escape(name)}(?: (\d{{4}}-\d{{2}}))?(?: #(\d+))?", title)
+    return (m.group(1) or "", int(m.group(2) or 1)) if m else None
+
+def shard_title(month: str, part: int = 1, name: str = GSHEET_NAME) -> str:
+    title = f"{name} {month}" if month else name
+    return title if part == 1 else f"{title} #{part}"
+
+def _retryable(e: Exception) -> bool:
+    import gspread
+    if isinstance(e, gspread.exceptions.APIError):
+        code = getattr(getattr(e, "response", None), "status_code", None)
+        return code in RETRYABLE_CODES
+    # network-level failures (timeouts, resets) are worth another try as well
+    return isinstance(e, (OSError, TimeoutError))
+
+def lead_row(username: str, chat_id: int, lang: str, name: str, phone: str, city: str, note: str) -> List[str]:
+    return [str(int(time.time())), username or "", str(chat_id), lang, "lead", name, phone, city, note]
+
 class SheetClient:
-    def __init__(self):
-        self.ws = None
+    """gspread wrapper with a journal-backed write-behind queue.
+
+    Handlers call :meth:`submit_lead`, which only commits the row to the local
+    :class:`utils.journal.LeadJournal`. A background task started by :meth:`start`
+    ships unsent journal rows with one ``append_rows`` call per batch
+    (``SHEETS_BATCH_SIZE`` rows or ``SHEETS_FLUSH_INTERVAL_SEC``, whichever comes
+    first) and acks them. On errors - quota, outage, Sheets not configured yet -
+    rows stay in the journal and are retried with backoff, also after a restart.
+
+    Leads go to worksheet shards: one per month of the lead's timestamp with
+    ``rotation="monthly"``, and a new part ("Leads 2026-10 #2") once a shard
+    holds ``max_rows`` leads, so appends never search a huge table. Handles and
+    row counts of all shards come from one ``worksheets()`` call in :meth:`init`;
+    a new shard is created together with its header in one request.
+    """
+
+    def __init__(self, batch_size: int = SHEETS_BATCH_SIZE, flush_interval: float = SHEETS_FLUSH_INTERVAL_SEC,
+                 journal: LeadJournal = journal, index: LeadIndex = lead_index, name: str = GSHEET_NAME,
+                 rotation: str = GSHEET_ROTATION, max_rows: int = GSHEET_MAX_ROWS):
+        self.sh = None
+        self.name = name
+        self.rotation = rotation
+        self.max_rows = max_rows
+        self._shards: Dict[str, object] = {}  # title -> gspread.Worksheet
+        self._rows: Dict[str, int] = {}       # title -> rows used, header included
+        self._part: Dict[str, int] = {}       # month -> part being appended to
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.journal = journal
+        self.index = index
+        self._indexed = False
+        self._flushing = False  # journal rows are selected for a write that has not been acked yet
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._backlog = 0
+        self._has_rows = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._init_lock = asyncio.Lock()
 
     def init(self):
+        # gspread + google-auth take ~0.2s to import; only pay for it when Sheets is actually used
+        import gspread
+        from google.oauth2.service_account import Credentials
         creds_dict = get_gsheets_credentials_dict()
         if not (creds_dict and SPREADSHEET_ID):
             log.warning("Google Sheets not configured.")
@@ -20,30 +107,313 @@ class SheetClient:
             scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
             creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
             client = gspread.authorize(creds)
-            sh = client.open_by_key(SPREADSHEET_ID)
-            try:
-                self.ws = sh.worksheet(GSHEET_NAME)
-            except gspread.WorksheetNotFound:
-                self.ws = sh.add_worksheet(title=GSHEET_NAME, rows=2000, cols=12)
-            if not self.ws.row_values(1):
-                self.ws.append_row(["TimestampUTC","Username","ChatID","Lang","Type","Name","Phone","City","Note"])
-            log.info("Google Sheets initialized.")
+            self.load_shards(client.open_by_key(SPREADSHEET_ID))
+            log.info("Google Sheets initialized (%d lead worksheets).", len(self._shards))
             return True
         except Exception as e:
             log.error("Sheets init error: %s", e)
-            self.ws = None
+            self.sh = None
             return False
 
+    def load_shards(self, sh):
+        """Blocking: cache a handle and the row count of every lead worksheet in ``sh``."""
+        self._shards, self._rows, self._part = {}, {}, {}
+        for ws in sh.worksheets():
+            key = shard_key(ws.title, self.name)
+            if key:
+                self._shards[ws.title] = ws
+                self._rows[ws.title] = ws.row_count  # shards are created one row high and grow with each append
+                self._part[key[0]] = max(self._part.get(key[0], 1), key[1])
+        # row_count is the grid size, which is only the rows in use for shards created here; an older or
+        # hand-made worksheet (the legacy "Leads" had 2000 rows) is counted by its first column instead,
+        # for the parts leads can still be appended to: this and last month's (replayed leads), or the only one
+        for month in {self._month(time.time()), self._month(time.time() - time.gmtime().tm_mday * 86400)}:
+            title = shard_title(month, self._part.get(month, 1), self.name)
+            if title in self._shards:
+                self._rows[title] = max(1, len(self._shards[title].col_values(1)))
+        self.sh = sh
+
+    def shards(self) -> List[str]:
+        """Lead worksheet titles, oldest first."""
+        return sorted(self._shards, key=lambda title: shard_key(title, self.name))
+
+    def worksheet(self, title: str):
+        """Blocking: the cached handle of a shard, creating the worksheet with its header if needed."""
+        ws = self._shards.get(title)
+        if ws is not None:
+            return ws
+        import gspread
+        sheet_id = zlib.crc32(title.encode()) & 0x7FFFFFFF
+        try:
+            self.sh.batch_update({"requests": [
+                {"addSheet": {"properties": {"sheetId": sheet_id, "title": title, "sheetType": "GRID",
+                                             "gridProperties": {"rowCount": 1, "columnCount": len(HEADER)}}}},
+                {"updateCells": {"start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0}, "fields": "userEnteredValue",
+                                 "rows": [{"values": [{"userEnteredValue": {"stringValue": h}} for h in HEADER]}]}},
+            ]})
+            ws = self.sh.get_worksheet_by_id(sheet_id)
+            log.info("Sheets: created worksheet %r", title)
+        except gspread.exceptions.APIError:
+            ws = self.sh.worksheet(title)  # another worker process created it first
+        self._shards[title] = ws
+        self._rows.setdefault(title, ws.row_count)
+        return ws
+
+    def remove_shard(self, title: str):
+        """Blocking: delete a shard (after archiving it). Updates of its leads are appended as new rows."""
+        self.sh.del_worksheet(self.worksheet(title))
+        self._forget(title)
+
+    def _forget(self, title: str):
+        """Drop a shard's cached handle; the next write to it looks the worksheet up (or creates it) again."""
+        self._shards.pop(title, None)
+        self._rows.pop(title, None)
+
+    def _month(self, ts: float) -> str:
+        return time.strftime("%Y-%m", time.gmtime(ts)) if self.rotation == "monthly" else ""
+
+    def _place(self, rows: List[Tuple[int, List[str]]]) -> Dict[str, List[Tuple[int, List[str]]]]:
+        """Group rows by the shard they are appended to, starting a new part where one would exceed ``max_rows``."""
+        groups: Dict[str, List[Tuple[int, List[str]]]] = {}
+        for i, row in rows:
+            try:
+                month = self._month(float(row[0]))
+            except ValueError:
+                month = self._month(time.time())
+            part = self._part.get(month, 1)
+            title = shard_title(month, part, self.name)
+            if self.max_rows and self._rows.get(title, 1) + len(groups.get(title, ())) > self.max_rows:
+                part = self._part[month] = part + 1
+                title = shard_title(month, part, self.name)
+            groups.setdefault(title, []).append((i, row))
+        return groups
+
     def append_lead(self, username: str, chat_id: int, lang: str, name: str, phone: str, city: str, note: str):
-        if not self.ws:
+        """Blocking single-row append. Prefer :meth:`submit_lead` inside the bot."""
+        if not self.sh:
             log.warning("Sheets not ready - skipping append.")
             return False
         try:
-            ts = int(time.time())
-            self.ws.append_row([str(ts), username or "", str(chat_id), lang, "lead", name, phone, city, note])
+            row = lead_row(username, chat_id, lang, name, phone, city, note)
+            [(title, _)] = self._place([(0, row)]).items()
+            self._appended(title, 1, self.worksheet(title).append_row(row))
             return True
         except Exception as e:
             log.error("Append lead error: %s", e)
             return False
 
+    async def ensure_ready(self) -> bool:
+        """Connect once, off the event loop; concurrent callers share the same attempt."""
+        async with self._init_lock:
+            if not self.sh:
+                await self._timed("init", self.init)
+            if self.sh and not self._indexed:
+                await self._load_index()
+            return bool(self.sh)
+
+    async def _load_index(self):
+        """Index recent leads already in the sheet: one read of the timestamp, ChatID and Phone columns
+        of each of the (at most two) newest shards the dedup window reaches into."""
+        self._indexed = True
+        if self.index.window <= 0:
+            return
+        since, n = time.time() - self.index.window, 0
+        for title in [t for t in self.shards() if shard_key(t, self.name)[0] >= self._month(since)][-2:]:
+            try:
+                ts_col, chat_col, phone_col = await self._timed(
+                    "batch_get", self._shards[title].batch_get, [_col("TimestampUTC"), _col("ChatID"), _col("Phone")])
+            except Exception as e:
+                log.warning("Sheets: dedup index not warmed from %r: %s", title, e)
+                continue
+            for i in range(max(len(ts_col), len(chat_col), len(phone_col))):
+                try:
+                    ts = float(_cell(ts_col, i))
+                except ValueError:
+                    continue
+                if ts >= since:
+                    self.index.add(_cell(phone_col, i), _cell(chat_col, i), LeadRef(ts, None, (title, i + 2)))
+                    n += 1
+        log.info("Sheets: dedup index warmed with %d recent leads", n)
+
+    # ===== write-behind queue =====
+
+    async def start(self):
+        if self._task:
+            return
+        self._stopping = False
+        self._stop.clear()
+        await self.journal.open()
+        if self.index.window > 0:
+            for lead_id, ts, chat_id, phone, lang, name, city, note, title, row in await self.journal.recent(
+                    int(time.time() - self.index.window)):
+                pos = (title or self.name, row) if row is not None else None
+                self.index.add(phone, chat_id, LeadRef(ts, lead_id, pos, (lang, name, phone, city, note)))
+        self._backlog = await self.journal.count_pending()
+        if self._backlog:
+            log.info("Sheets: replaying %d unsent leads from journal", self._backlog)
+            self._has_rows.set()
+        self._task = asyncio.create_task(self._run(), name="sheets-writer")
+
+    async def submit_lead(self, username: str, chat_id: int, lang: str, name: str, phone: str, city: str,
+                          note: str) -> Optional[str]:
+        """Journal a lead and return NEW, UPDATED or DUPLICATE (None if the journal failed).
+
+        A lead with the same phone or user as one submitted within the dedup window
+        is not a new row: an identical one is dropped, a changed one overwrites the
+        earlier lead - in the journal if it has not been shipped yet, else in its sheet row.
+        """
+        row = lead_row(username, chat_id, lang, name, phone, city, note)
+        now, fields = time.time(), (lang, name, phone, city, note)
+        ref = self.index.find(phone, chat_id, now)
+        if ref is not None and ref.fields == fields:
+            self.index.touch(ref, phone, chat_id, now)
+            LEADS_DEDUPED.inc(DUPLICATE)
+            return DUPLICATE
+        try:
+            if ref is None:
+                self.index.add(phone, chat_id, LeadRef(now, await self.journal.append(row), None, fields))
+                status = NEW
+            else:
+                status = UPDATED
+                LEADS_DEDUPED.inc(UPDATED)
+                ref.fields = fields
+                self.index.touch(ref, phone, chat_id, now)
+                # while the writer holds selected rows (from the select until their ack, even
+                # across a slow first connect) a merge could land after the select and be
+                # acked unseen, so the change is journaled as an update row instead
+                if ref.lead_id is not None and not self._flushing \
+                        and await self.journal.merge(ref.lead_id, row):
+                    return status  # still queued, now with the new data
+                ref.lead_id = await self.journal.append(row, dup_of=ref.lead_id, sheet_pos=ref.sheet_pos)
+        except Exception as e:
+            log.error("Journal append error - lost lead: %s (%s)", row, e)
+            return None
+        self._backlog += 1
+        self._has_rows.set()
+        if self._backlog >= self.batch_size:
+            self._batch_full.set()
+        return status
+
+    async def close(self, timeout: float = SHEETS_SHUTDOWN_TIMEOUT_SEC):
+        """Make a last attempt to ship the backlog, stop the writer and close the journal.
+
+        Whatever cannot be sent within ``timeout`` stays in the journal for the next start.
+        """
+        if not self._task:
+            return
+        self._stopping = True
+        self._stop.set(); self._has_rows.set(); self._batch_full.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            log.warning("Sheets writer did not drain in %.0fs, %d leads kept in journal", timeout, self._backlog)
+        self._task = None
+        await self.journal.close()
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            if not self._backlog and not self._stopping:
+                await self._has_rows.wait()
+            if self._backlog < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._has_rows.clear(); self._batch_full.clear()
+            ok = await self._flush_pending()
+            if self._stopping:
+                return
+            if ok:
+                delay = 1.0
+                continue
+            try:
+                await asyncio.wait_for(self._stop.wait(), delay + random.uniform(0, delay / 2))
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, SHEETS_MAX_BACKOFF_SEC)
+
+    async def _flush_pending(self) -> bool:
+        """Ship unsent journal rows in batches until none are left. False on failure."""
+        while True:
+            self._flushing = True  # before the select is queued: merges queued after it must not happen
+            try:
+                ok = await self._flush_batch()
+            finally:
+                self._flushing = False
+            if ok is not None:
+                return ok
+
+    async def _flush_batch(self) -> Optional[bool]:
+        """Ship one batch; None if there may be more, else whether everything was shipped."""
+        pending = await self.journal.pending(self.batch_size)
+        if not pending:
+            self._backlog = 0
+            return True
+        if not await self.ensure_ready():
+            return False
+        updates: Dict[str, List[tuple]] = {}
+        appends = []
+        for i, row, target in pending:
+            title = target and (target[0] or self.name)
+            if title in self._shards:
+                updates.setdefault(title, []).append((i, row, target[1]))
+            else:  # a new lead, or an update of one whose worksheet has been archived
+                appends.append((i, row))
+        done, positions = [], []
+        try:
+            # every call is acked as soon as it succeeds, so a failure never re-sends earlier calls' rows
+            for title, group in updates.items():
+                try:
+                    await self._timed("batch_update", self._shards[title].batch_update,
+                                      [{"range": f"A{r}:{LAST_COL}{r}", "values": [row]} for _, row, r in group])
+                except Exception as e:
+                    if _retryable(e):
+                        raise
+                    # e.g. the worksheet was archived and deleted by export.py while we held its handle
+                    log.warning("Sheets: cannot update %r, appending its %d rows instead: %s", title, len(group), e)
+                    self._forget(title)
+                    appends += [(i, row) for i, row, _ in group]
+                    continue
+                done += [i for i, _, _ in group]
+                positions += [(title, r) for _, _, r in group]
+            for title, group in self._place(appends).items():
+                ws = self._shards.get(title) or await self._timed("add_worksheet", self.worksheet, title)
+                try:
+                    resp = await self._timed("append_rows", ws.append_rows, [row for _, row in group])
+                except Exception as e:
+                    if not _retryable(e):
+                        self._forget(title)  # a stale handle would fail the same way on every retry
+                    raise
+                first = self._appended(title, len(group), resp)
+                done += [i for i, _ in group]
+                positions += [(title, first + k) if first else None for k in range(len(group))]
+                SHEETS_ROWS.inc(amount=len(group))
+        except Exception as e:
+            level = logging.WARNING if _retryable(e) else logging.ERROR
+            log.log(level, "Sheets write of %d rows failed, kept in journal: %s", len(pending) - len(done), e)
+            return False
+        finally:
+            await self.journal.ack(done, positions)
+            self._backlog = max(0, self._backlog - len(done))
+        log.info("Sheets: appended %d rows, updated %d", len(appends), len(pending) - len(appends))
+        return None
+
+    def _appended(self, title: str, n: int, resp) -> Optional[int]:
+        """First row written by an append of ``n`` rows; keeps the shard's row count current."""
+        first = _first_row(resp)
+        self._rows[title] = first + n - 1 if first else self._rows.get(title, 1) + n
+        return first
+
+    async def _timed(self, op: str, fn, *args):
+        """Run a blocking gspread call in a thread, recording latency and failures."""
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception:
+            SHEETS_ERRORS.inc(op)
+            raise
+        finally:
+            SHEETS_SECONDS.observe(time.perf_counter() - t0, op)
+
 sheets = SheetClient()
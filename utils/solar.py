@@ -0,0 +1,144 @@
+# utils/solar.py
+"""Solar sizing engine: one NumPy pass over a grid of what-if scenarios.
+
+Axes of every result array, in order: region, system size, tariff escalation,
+panel degradation, year. Monthly generation comes from a regional PSH profile
+scaled to the customer's annual-average PSH, so the yearly total always matches
+the simple ``kW * PSH * 365 * performance`` estimate.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import config
+
+DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=float)
+
+# typical monthly peak-sun-hours; only the shape is used (keys: config.SOLAR_REGIONS)
+_PSH_MONTHLY = {
+    "flat": [1.0] * 12,
+    "PL": [0.9, 1.6, 2.7, 4.0, 5.0, 5.2, 5.2, 4.5, 3.2, 2.0, 1.0, 0.7],
+    "DE": [1.0, 1.8, 2.8, 4.2, 5.0, 5.3, 5.3, 4.6, 3.4, 2.1, 1.1, 0.8],
+    "UA": [1.0, 1.8, 3.0, 4.2, 5.3, 5.5, 5.5, 4.9, 3.5, 2.2, 1.1, 0.8],
+    "ES": [2.8, 3.7, 5.0, 5.8, 6.7, 7.5, 7.8, 7.0, 5.6, 4.0, 3.0, 2.5],
+}
+
+def _normalize(shape) -> np.ndarray:
+    shape = np.asarray(shape, dtype=float)
+    return shape * 365 / (shape * DAYS).sum()
+
+PSH_PROFILES: Dict[str, np.ndarray] = {k: _normalize(v) for k, v in _PSH_MONTHLY.items()}
+REGIONS = tuple(PSH_PROFILES)
+
+SIZE_STEPS = (0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 1.4, 1.5)  # default sizes, x the matching size
+ESCALATION_STEPS = (0.0, 0.02, 0.04, 0.06)
+DEGRADATION_STEPS = (0.0, 0.005, 0.01)
+
+def kw_needed(consumption: float, psh: float, performance: float = config.SOLAR_PERFORMANCE) -> float:
+    """System size whose average month covers ``consumption`` kWh."""
+    return consumption / (psh * 30 * performance)
+
+@dataclass(frozen=True)
+class SolarSweep:
+    regions: Tuple[str, ...]
+    sizes: np.ndarray          # kW, (S,)
+    escalation: np.ndarray     # yearly tariff growth, (E,)
+    degradation: np.ndarray    # yearly output loss, (D,)
+    cost: np.ndarray           # €, (S,)
+    generation: np.ndarray     # kWh per year, (R, S, D, Y)
+    savings: np.ndarray        # € per year, (R, S, E, D, Y)
+    cumulative: np.ndarray     # € net of the system cost, (R, S, E, D, Y)
+    payback: np.ndarray        # years, inf if not within the horizon, (R, S, E, D)
+
+    @property
+    def years(self) -> int:
+        return self.savings.shape[-1]
+
+    def scenario(self, r: int, s: int, e: int, d: int) -> dict:
+        return {"region": self.regions[r], "kw": float(self.sizes[s]), "escalation": float(self.escalation[e]),
+                "degradation": float(self.degradation[d]), "cost": float(self.cost[s]),
+                "gen": float(self.generation[r, s, d, 0]), "save": float(self.savings[r, s, e, d, 0]),
+                "payback": float(self.payback[r, s, e, d]), "total": float(self.cumulative[r, s, e, d, -1])}
+
+    def best(self) -> dict:
+        """Scenario with the highest net savings over the horizon."""
+        return self.scenario(*np.unravel_index(np.argmax(self.cumulative[..., -1]), self.payback.shape))
+
+def frozen(a: np.ndarray) -> np.ndarray:
+    """Make a cached result read-only: it is shared by every caller that hits the cache."""
+    a.flags.writeable = False
+    return a
+
+def _compute(consumption: float, tariff: float, psh: float, sizes: Tuple[float, ...], escalation: Tuple[float, ...],
+           degradation: Tuple[float, ...], regions: Tuple[str, ...], years: int, export_ratio: float,
+           cost_per_kw: float, performance: float) -> SolarSweep:
+    sizes_a, esc_a, deg_a = np.array(sizes), np.array(escalation), np.array(degradation)
+    profiles = np.stack([PSH_PROFILES[r] for r in regions])                            # R,12
+    year = np.arange(years)
+    load = consumption * 12 * DAYS / 365                                               # 12
+    month_gen = sizes_a[None, :, None] * profiles[:, None, :] * (psh * performance * DAYS)  # R,S,12
+    gen = month_gen[:, :, None, None, :] * ((1 - deg_a)[:, None] ** year)[None, None, :, :, None]  # R,S,D,Y,12
+    used = np.minimum(gen, load)
+    value = (used + export_ratio * (gen - used)).sum(-1) * tariff                      # R,S,D,Y
+    savings = value[:, :, None] * ((1 + esc_a)[:, None] ** year)[None, None, :, None]  # R,S,E,D,Y
+    cost = sizes_a * cost_per_kw
+    cumulative = savings.cumsum(-1) - cost[None, :, None, None, None]
+
+    hit = cumulative >= 0
+    first = hit.argmax(-1)[..., None]
+    before = np.take_along_axis(cumulative - savings, first, -1)[..., 0]
+    step = np.take_along_axis(savings, first, -1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = np.where(hit.any(-1), first[..., 0] - before / step, np.inf)
+    return SolarSweep(regions, frozen(sizes_a), frozen(esc_a), frozen(deg_a), frozen(cost),
+                      frozen(gen.sum(-1)), frozen(savings), frozen(cumulative), frozen(payback))
+
+_sweep = lru_cache(maxsize=config.SOLAR_CACHE_SIZE)(_compute)
+
+def _q(value: float, step: float) -> float:
+    return round(round(value / step) * step, 6)
+
+def sweep(consumption: float, tariff: float, psh: float = 4.5, *, sizes: Optional[Sequence[float]] = None,
+          escalation: Sequence[float] = ESCALATION_STEPS, degradation: Sequence[float] = DEGRADATION_STEPS,
+          regions: Sequence[str] = REGIONS, years: int = config.SOLAR_HORIZON_YEARS,
+          export_ratio: float = config.SOLAR_EXPORT_RATIO, cost_per_kw: float = config.SOLAR_COST_PER_KW,
+          performance: float = config.SOLAR_PERFORMANCE) -> SolarSweep:
+    """Evaluate every combination of the given axes.
+
+    ``consumption`` is kWh/month, ``tariff`` €/kWh, ``psh`` the annual-average peak sun hours.
+    ``sizes`` defaults to :data:`SIZE_STEPS` around :func:`kw_needed`. Surplus generation is
+    credited at ``export_ratio`` x tariff (1.0 = net metering). Inputs are quantized (1 kWh,
+    0.001 €, 0.05 h, 0.01 kW) so near-identical queries hit the cache.
+    """
+    consumption, tariff, psh = _q(consumption, 1), _q(tariff, 0.001), _q(psh, 0.05)
+    if consumption <= 0 or tariff <= 0 or psh <= 0 or years <= 0:
+        raise ValueError("bad values")
+    if sizes is None:
+        base = kw_needed(consumption, psh, performance)
+        sizes = [base * k for k in SIZE_STEPS]
+    sizes = tuple(sorted({_q(s, 0.01) for s in sizes if s > 0}))
+    if not sizes:
+        raise ValueError("bad values")
+    unknown = set(regions) - set(PSH_PROFILES)
+    if unknown:
+        raise ValueError(f"unknown regions: {sorted(unknown)}")
+    return _sweep(consumption, tariff, psh, sizes, tuple(_q(e, 0.001) for e in escalation),
+                  tuple(_q(d, 0.0001) for d in degradation), tuple(regions), int(years),
+                  float(export_ratio), float(cost_per_kw), float(performance))
+
+sweep.cache_info = _sweep.cache_info
+
+def estimate(consumption: float, tariff: float, psh: float = 4.5) -> dict:
+    """The single offer shown in the bot: matching size, configured region, escalation and degradation.
+    Computed from the exact inputs (one scenario, not cached), so with the defaults it equals the
+    simple formula up to float rounding. A payback beyond the horizon is reported as the simple cost / first-year savings ratio."""
+    if not consumption > 0 or not tariff > 0 or not psh > 0:
+        raise ValueError("bad values")
+    res = _compute(float(consumption), float(tariff), float(psh), (kw_needed(consumption, psh),),
+                   (config.SOLAR_TARIFF_ESCALATION,), (config.SOLAR_DEGRADATION,), (config.SOLAR_REGION,),
+                   config.SOLAR_HORIZON_YEARS, config.SOLAR_EXPORT_RATIO, config.SOLAR_COST_PER_KW,
+                   config.SOLAR_PERFORMANCE)
+    r = res.scenario(0, 0, 0, 0)
+    if r["payback"] == float("inf"):
+        r["payback"] = r["cost"] / r["save"]
+    return r
@@ -0,0 +1,113 @@
+# utils/stats.py
+import time
+from collections import Counter
+from typing import Hashable, List, Optional, Tuple
+import config
+
+DAY = 86400
+
+class DailySeries:
+    """Counts per key for each of the last ``days`` UTC days.
+
+    A ring of per-day slots: a slot is reset when its day comes round again,
+    so :meth:`add` is O(1), memory is bounded by days x keys, and nothing ever
+    has to be rescanned to answer "how many per day".
+    """
+
+    def __init__(self, days: int):
+        self.days = max(1, days)
+        self._day = [-1] * self.days
+        self._counts: List[Counter] = [Counter() for _ in range(self.days)]
+
+    def add(self, key: Hashable, n: int = 1, now: Optional[float] = None):
+        day = int((time.time() if now is None else now) // DAY)
+        i = day % self.days
+        if self._day[i] != day:
+            if self._day[i] > day:
+                return  # older than the ring reaches
+            self._day[i], self._counts[i] = day, Counter()
+        self._counts[i][key] += n
+
+    def per_day(self, days: int, now: Optional[float] = None) -> List[Tuple[int, Counter]]:
+        """(day number, counts) for the last ``days`` days, newest first."""
+        today = int((time.time() if now is None else now) // DAY)
+        out = []
+        for day in range(today, today - min(days, self.days), -1):
+            i = day % self.days
+            out.append((day, self._counts[i] if self._day[i] == day else Counter()))
+        return out
+
+    def total(self, days: int, now: Optional[float] = None) -> Counter:
+        out = Counter()
+        for _, counts in self.per_day(days, now):
+            out.update(counts)
+        return out
+
+# form steps in the order the user reaches them (the state a handler moved the user to)
+FUNNEL = [("name", "Имя"), ("phone", "Телефон"), ("city", "Город"), ("note", "Комментарий"), ("sent", "Отправлено")]
+CALCULATORS = [("credit", "Кредит"), ("solar", "Солнце")]
+
+class BotStats:
+    """Live numbers for /admin, updated by the handlers as things happen.
+
+    Each worker process counts only the chats it serves (``worker`` is set in
+    workers, and the report says so); everything resets on restart.
+    """
+
+    def __init__(self, days: int = 30):
+        self.started = time.time()
+        self.worker: Optional[int] = None  # index of this worker process when WORKERS > 1
+        self.leads = DailySeries(days)     # lang -> new leads
+        self.outcomes = DailySeries(days)  # new / updated / duplicate / lost
+        self.funnel = DailySeries(days)    # step reached (FUNNEL, plus phone_invalid and cancel)
+        self.calcs = DailySeries(days)     # (calculator, open / ok / compare / bad)
+
+    def lead(self, lang: str, status: Optional[str]):
+        status = status or "lost"
+        self.outcomes.add(status)
+        if status == "new":
+            self.leads.add(lang)
+
+    def step(self, step: str):
+        self.funnel.add(step)
+
+    def calc(self, name: str, outcome: str):
+        self.calcs.add((name, outcome))
+
+    def report(self, days: int = 7, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        days = max(1, min(days, self.leads.days))
+        lines = [f"📊 Статистика за {days} дн. (счётчики с {time.strftime('%Y-%m-%d %H:%M', time.gmtime(self.started))} UTC)"]
+        if self.worker is not None:
+            lines.append(f"⚠️ Только воркер {self.worker + 1} из {config.WORKERS}: чаты других воркеров здесь не учтены")
+        lines += ["", "🆕 Новые заявки по дням:"]
+        for day, counts in self.leads.per_day(days, now):
+            langs = ", ".join(f"{lang} {n}" for lang, n in counts.most_common())
+            lines.append(f"{time.strftime('%Y-%m-%d', time.gmtime(day * DAY))}: {sum(counts.values())}"
+                         + (f" ({langs})" if langs else ""))
+        by_lang = self.leads.total(days, now)
+        out = self.outcomes.total(days, now)
+        lines.append(f"Всего: {out['new']} новых, {out['updated']} обновлено, {out['duplicate']} повторов"
+                     + (f", {out['lost']} не записано" if out["lost"] else ""))
+        if by_lang:
+            lines.append("По языкам: " + ", ".join(f"{lang} {n}" for lang, n in by_lang.most_common()))
+
+        steps = self.funnel.total(days, now)
+        lines += ["", "🧭 Воронка заявки:"]
+        prev = None
+        for key, label in FUNNEL:
+            n = steps[key]
+            share = f" ({n / prev:.0%})" if prev else ""
+            lines.append(f"{label}: {n}{share}")
+            prev = n
+        lines.append(f"Неверный телефон: {steps['phone_invalid']}, отмена: {steps['cancel']}")
+
+        calcs = self.calcs.total(days, now)
+        lines += ["", "🧮 Калькуляторы (открыт / расчёт / ошибка ввода):"]
+        for key, label in CALCULATORS:
+            ok = calcs[(key, "ok")] + calcs[(key, "compare")]
+            extra = f", сравнений {calcs[(key, 'compare')]}" if calcs[(key, "compare")] else ""
+            lines.append(f"{label}: {calcs[(key, 'open')]} / {ok} / {calcs[(key, 'bad')]}{extra}")
+        return "\n".join(lines)
+
+stats = BotStats(config.STATS_DAYS)
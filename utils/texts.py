@@ -38,12 +38,15 @@ TEXTS: Dict[str, Dict[str, str]] = {
     "phone_invalid": {"ru":"Похоже, телефон некорректный. Введите +48123456789.","en":"Phone looks invalid. Send like +48123456789.","es":"Teléfono no válido. Envía: +48123456789.","pl":"Nieprawidłowy numer. Wyślij np. +48123456789.","de":"Ungültige Nummer. Senden Sie z. B. +48123456789.","uk":"Невірний номер. Надішліть так: +48123456789."},
 
     # Credit
-    "credit_prompt": {"ru":"Введите: СУММА(€) СРОК_ЛЕТ СТАВКА_%\nПример: 8000 5 8","en":"Enter: AMOUNT(€) YEARS RATE_%\nExample: 8000 5 8","es":"Ingresa: MONTO(€) AÑOS TASA_%\nEjempl: 8000 5 8","pl":"Podaj: KWOTA LATA OPROC_%\nNp.: 8000 5 8","de":"Geben Sie: BETRAG JAHRE ZINS_%\nBsp.: 8000 5 8","uk":"Введіть: СУМА(€) РОКИ СТАВКА_%\nПриклад: 8000 5 8"},
+    "credit_prompt": {"ru":"Введите: СУММА(€) СРОК_ЛЕТ СТАВКА_% [ВЫКУП_€]\nПример: 8000 5 8\nСравнить варианты — через «;»: 8000 5 8; 8000 36мес 0","en":"Enter: AMOUNT(€) YEARS RATE_% [BALLOON_€]\nExample: 8000 5 8\nCompare offers with ';': 8000 5 8; 8000 36m 0","es":"Ingresa: MONTO(€) AÑOS TASA_% [PAGO_FINAL_€]\nEjempl: 8000 5 8\nCompara ofertas con ';': 8000 5 8; 8000 36m 0","pl":"Podaj: KWOTA LATA OPROC_% [BALON_€]\nNp.: 8000 5 8\nPorównaj oferty przez ';': 8000 5 8; 8000 36m 0","de":"Geben Sie: BETRAG JAHRE ZINS_% [SCHLUSSRATE_€]\nBsp.: 8000 5 8\nAngebote vergleichen mit ';': 8000 5 8; 8000 36m 0","uk":"Введіть: СУМА(€) РОКИ СТАВКА_% [ВИКУП_€]\nПриклад: 8000 5 8\nПорівняти варіанти — через «;»: 8000 5 8; 8000 36міс 0"},
     "credit_badfmt": {"ru":"Формат неверный. Пример: 8000 5 8","en":"Wrong format. Example: 8000 5 8","es":"Formato incorrecto.","pl":"Błędny format.","de":"Falsches Format.","uk":"Невірний формат."},
     "credit_result": {"ru":"Ежемесячный платёж: {monthly} €\nСумма выплат: {total} €\nПереплата: {over} €","en":"Monthly: {monthly} €\nTotal: {total} €\nOverpayment: {over} €","es":"Mensual: {monthly} €\nTotal: {total} €\nIntereses: {over} €","pl":"Rata: {monthly} €\nSuma: {total} €\nNadpłata: {over} €","de":"Monatlich: {monthly} €\nGesamt: {total} €\nZinsen: {over} €","uk":"Щомісячно: {monthly} €\nРазом: {total} €\nПереплата: {over} €"},
+    "credit_row": {"ru":"{n}) {amount} € · {months} мес · {rate}%{balloon}: {monthly} €/мес, переплата {over} €","en":"{n}) {amount} € · {months} mo · {rate}%{balloon}: {monthly} €/mo, overpayment {over} €","es":"{n}) {amount} € · {months} meses · {rate}%{balloon}: {monthly} €/mes, intereses {over} €","pl":"{n}) {amount} € · {months} mies. · {rate}%{balloon}: {monthly} €/mies., nadpłata {over} €","de":"{n}) {amount} € · {months} Mon. · {rate}%{balloon}: {monthly} €/Mon., Zinsen {over} €","uk":"{n}) {amount} € · {months} міс · {rate}%{balloon}: {monthly} €/міс, переплата {over} €"},
+    "credit_balloon": {"ru":" + {balloon} € в конце","en":" + {balloon} € at the end","es":" + {balloon} € al final","pl":" + {balloon} € na koniec","de":" + {balloon} € am Ende","uk":" + {balloon} € наприкінці"},
+    "credit_best": {"ru":"✅ Выгоднее всего: вариант {n}","en":"✅ Cheapest: offer {n}","es":"✅ Más barata: oferta {n}","pl":"✅ Najtańsza: oferta {n}","de":"✅ Am günstigsten: Angebot {n}","uk":"✅ Найвигідніше: варіант {n}"},
 
     # Solar
     "solar_prompt": {"ru":"Введи: ПОТРЕБЛЕНИЕ_кВт·ч/мес ТАРИФ_€/кВт·ч [PSH=4.5]\nПр.: 450 0.22 4.2","en":"Enter: CONSUMPTION_kWh/month TARIFF_€/kWh [PSH=4.5]","es":"Ingresa: CONSUMO_kWh/mes TARIFA_€/kWh [PSH=4.5]","pl":"Podaj: ZUŻYCIE_kWh/mies TARYFA_€/kWh [PSH=4.5]","de":"Eingabe: VERBRAUCH_kWh/Monat TARIF_€/kWh [PSH=4.5]","uk":"Введіть: СПОЖИВАННЯ_кВт·год/міс ТАРИФ_€/кВт·год [PSH=4.5]"},
     "solar_badfmt": {"ru":"Формат неверный. Пример: 450 0.22 4.2","en":"Wrong format. Example: 450 0.22 4.2","es":"Formato incorrecto.","pl":"Błędny format.","de":"Falsches Format.","uk":"Невірний формат."},
-    "solar_result": {"ru":"Система: ~{kw} кВт\nЦена: ~{cost} € ({cperkW} €/кВт)\nГенерация/год: ~{gen} кВт·ч\nЭкономия/год: ~{save} €\nОкупаемость: ~{payback} лет","en":"System: ~{kw} kW\nCost: ~{cost} € ({cperkW} €/kW)\nYearly gen: ~{gen} kWh\nYearly saving: ~{save} €\nPayback: ~{payback} years","es":"Sistema: ~{kw} kW\nCosto: ~{cost} €","pl":"System: ~{kw} kW\nKoszt: ~{cost} €","de":"Anlage: ~{kw} kW\nKosten: ~{cost} €","uk":"Система: ~{kw} кВт\nВартість: ~{cost} €"}
+    "solar_result": {"ru":"Система: ~{kw} кВт\nЦена: ~{cost} € ({cperkW} €/кВт)\nГенерация/год: ~{gen} кВт·ч\nЭкономия/год: ~{save} €\nОкупаемость: ~{payback} лет","en":"System: ~{kw} kW\nCost: ~{cost} € ({cperkW} €/kW)\nYearly gen: ~{gen} kWh\nYearly saving: ~{save} €\nPayback: ~{payback} years","es":"Sistema: ~{kw} kW\nCosto: ~{cost} € ({cperkW} €/kW)\nGeneración/año: ~{gen} kWh\nAhorro/año: ~{save} €\nAmortización: ~{payback} años","pl":"System: ~{kw} kW\nKoszt: ~{cost} € ({cperkW} €/kW)\nProdukcja/rok: ~{gen} kWh\nOszczędność/rok: ~{save} €\nZwrot: ~{payback} lat","de":"Anlage: ~{kw} kW\nKosten: ~{cost} € ({cperkW} €/kW)\nErtrag/Jahr: ~{gen} kWh\nErsparnis/Jahr: ~{save} €\nAmortisation: ~{payback} Jahre","uk":"Система: ~{kw} кВт\nВартість: ~{cost} € ({cperkW} €/кВт)\nГенерація/рік: ~{gen} кВт·год\nЕкономія/рік: ~{save} €\nОкупність: ~{payback} років"}
 }
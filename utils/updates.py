@@ -0,0 +1,78 @@
+# utils/updates.py
+import asyncio, time
+from typing import Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from utils.metrics import CHAT_QUEUE_DEPTH, UPDATE_WAIT, UPDATES_WAITING
+
+class _ChatQueue:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0  # updates of this chat queued or running
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different chats concurrently, each chat's updates one at a time in order.
+
+    PTB's (final) :meth:`process_update` gives an update one of
+    ``max_concurrent_updates`` slots, in arrival order; :meth:`do_process_update`
+    then takes its chat's lock (FIFO too, so arrival order is kept and
+    ConversationHandler never sees two steps of one chat at once). An update
+    waiting for its chat holds its slot, so a chat that floods the bot can tie up
+    several; the flood guard drops such bursts quickly. Updates without a chat or
+    user (polls, ...) take no lock. Locks exist only while their chat has updates
+    in flight.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._waiting = 0
+
+    @staticmethod
+    def chat_key(update: object) -> Optional[int]:
+        if isinstance(update, Update):
+            chat, user = update.effective_chat, update.effective_user
+            if chat:
+                return chat.id
+            if user:
+                return user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        key = self.chat_key(update)
+        if key is None:
+            await coroutine
+            return
+        # no await before the lock is queued for: that keeps the order the slots were given in
+        q = self._chats.get(key)
+        if q is None:
+            q = self._chats[key] = _ChatQueue()
+        CHAT_QUEUE_DEPTH.observe(q.refs)
+        q.refs += 1
+        self._set_waiting(+1)
+        t0 = time.perf_counter()
+        acquired = False
+        try:
+            async with q.lock:
+                acquired = True
+                self._set_waiting(-1)
+                UPDATE_WAIT.observe(time.perf_counter() - t0, "chat")
+                await coroutine
+        finally:
+            if not acquired:
+                self._set_waiting(-1)
+            q.refs -= 1
+            if not q.refs:
+                del self._chats[key]
+
+    def _set_waiting(self, delta: int):
+        self._waiting += delta
+        UPDATES_WAITING.set(self._waiting)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
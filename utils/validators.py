@@ -1,12 +1,58 @@
 # utils/validators.py
-import phonenumbers
+import asyncio, re, threading, unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+from config import PHONE_CACHE_SIZE, PHONE_WORKERS
 
 DEFAULT_REGION = "PL"
 
-def normalize_phone(raw: str) -> str | None:
-    if not raw:
-        return None
-    txt = raw.strip().replace(" ", "").replace("-", "")
+_SEPARATORS = re.compile(r"[\s\-().\/\u2010-\u2015\u2212]")  # incl. "151/1234567" and typographic dashes
+# what people put around a number: a label before it ("tel:", "мой номер"), an extension after it
+# ("ext 12", "доб. 3", "wew. 3", ";ext=1") - anything from the first non-digit after a digit
+_PREFIX = re.compile(r"^[^\d+]+")
+_EXTENSION = re.compile(r"(?<=\d)\D.*$", re.DOTALL)
+# E.164 allows at most 15 digits; anything shorter than 5 is not a callable number anywhere we sell
+_PLAUSIBLE = re.compile(r"\+?\d{5,17}")
+_MISS = object()
+
+class _LRU:
+    """Small thread-safe LRU: parses run in the pool, lookups on the event loop."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._data.get(key, _MISS)
+            if value is not _MISS:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Optional[str]):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+_cache = _LRU(PHONE_CACHE_SIZE)
+_executor = ThreadPoolExecutor(max_workers=PHONE_WORKERS, thread_name_prefix="phone")
+
+def clean_phone(raw: str) -> str:
+    """The digits (and leading +) of a typed number: full-width digits folded,
+    separators, a label before the number and an extension after it dropped.
+    Numbers spelled with letters ("+1-800-FLOWERS") lose their letters and are rejected."""
+    txt = _SEPARATORS.sub("", unicodedata.normalize("NFKC", raw).strip())
+    txt = _EXTENSION.sub("", _PREFIX.sub("", txt))
+    if txt.startswith("00"):
+        txt = "+" + txt[2:]
+    return txt
+
+def _parse(txt: str) -> Optional[str]:
+    import phonenumbers  # metadata is loaded on first use (or by warm_up), not at bot start
     try:
         if txt.startswith("+"):
             num = phonenumbers.parse(txt, None)
@@ -17,3 +63,50 @@ def normalize_phone(raw: str) -> str | None:
         return None
     except Exception:
         return None
+
+def _parse_cached(txt: str) -> Optional[str]:
+    value = _cache.get(txt)
+    if value is _MISS:
+        value = _parse(txt)
+        _cache.put(txt, value)
+    return value
+
+def normalize_phone(raw: str) -> str | None:
+    if not raw:
+        return None
+    txt = clean_phone(raw)
+    if not _PLAUSIBLE.fullmatch(txt):
+        return None
+    return _parse_cached(txt)
+
+async def normalize_phone_async(raw: str) -> str | None:
+    """normalize_phone for the event loop: cache hits and garbage return at once, cold parses run in the pool."""
+    if not raw:
+        return None
+    txt = clean_phone(raw)
+    if not _PLAUSIBLE.fullmatch(txt):
+        return None
+    value = _cache.get(txt)
+    if value is not _MISS:
+        return value
+    return await asyncio.get_running_loop().run_in_executor(_executor, _parse_cached, txt)
+
+def warm_up():
+    """Import phonenumbers and load the default region's metadata ahead of the first lead."""
+    _parse("+48512345678")
+
+def normalize_many(values: Iterable[str]) -> List[Optional[str]]:
+    """Batch normalize_phone; each distinct input is parsed once."""
+    seen = {}
+    out = []
+    for raw in values:
+        if raw not in seen:
+            seen[raw] = normalize_phone(raw)
+        out.append(seen[raw])
+    return out
+
+def revalidate_phones(values: Iterable[str]) -> List[Tuple[int, str, Optional[str]]]:
+    """For a phone column (e.g. stored leads), return (index, stored, normalized) for every
+    entry that is not already valid E.164; normalized is None when the number is invalid."""
+    values = list(values)
+    return [(i, raw, norm) for i, (raw, norm) in enumerate(zip(values, normalize_many(values))) if raw != norm]
@@ -0,0 +1,62 @@
+# utils/webhook.py
+import hmac, json, logging, time
+from typing import Awaitable, Callable, Optional
+from aiohttp import web
+
+log = logging.getLogger("webhook")
+
+Sink = Callable[[dict], Awaitable[None]]
+
+class WebhookServer:
+    """Minimal aiohttp server that receives Telegram updates.
+
+    ``POST /<path>`` hands the raw update dict to ``sink`` and answers 200 as soon
+    as it is queued, so Telegram can deliver the next one. ``GET /healthz``
+    reports liveness plus whatever ``status`` returns.
+    """
+
+    def __init__(self, sink: Sink, path: str, secret: str = "", host: str = "0.0.0.0", port: int = 8080,
+                 status: Optional[Callable[[], dict]] = None):
+        self.sink = sink
+        self.path = "/" + path.strip("/")
+        self.secret = secret
+        self.host, self.port = host, port
+        self.status = status
+        self.started_at = time.time()
+        self.received = 0
+        self.app = web.Application()
+        self.app.router.add_post(self.path, self._on_update)
+        self.app.router.add_get("/healthz", self._on_health)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info("Webhook server listening on %s:%s%s", self.host, self.port, self.path)
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _on_update(self, request: web.Request) -> web.Response:
+        if self.secret:
+            got = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(got, self.secret):
+                return web.Response(status=403)
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            return web.Response(status=400)
+        self.received += 1
+        await self.sink(data)
+        return web.Response()
+
+    async def _on_health(self, request: web.Request) -> web.Response:
+        body = {"status": "ok", "uptime_sec": int(time.time() - self.started_at), "received": self.received}
+        if self.status:
+            body.update(self.status())
+        return web.json_response(body)